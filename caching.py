@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from threading import Lock
+
+MISSING = object()  # returned by get when a key isn't cached, since None/False can be cached values
+
+
+class LRUCache:
+    # bounded cache that throws away the least recently used entries once it has more than max_entries entries or
+    # the sizes of its entries add up to more than max_size, it can be used from more than one thread
+    def __init__(self, max_entries=None, max_size=None):
+        self.max_entries = max_entries
+        self.max_size = max_size    # e.g. a byte budget, each entry's size is given when it is added
+        self.entries = OrderedDict()    # key: (value, size) ordered from least to most recently used
+        self.size = 0   # total size of all entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)   # entry is now the most recently used
+                return self.entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, size=0):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries[key][1]
+            self.entries[key] = (value, size)
+            self.entries.move_to_end(key)
+            self.size += size
+            while self.entries and ((self.max_entries is not None and len(self.entries) > self.max_entries) or
+                                    (self.max_size is not None and self.size > self.max_size)):
+                self.size -= self.entries.popitem(last=False)[1][1]     # removes the least recently used entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "size": self.size}
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
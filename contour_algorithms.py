@@ -0,0 +1,239 @@
+import numpy as np  # numpy is needed for array processing
+
+# edges of a cell are numbered 0: top (a-b), 1: right (b-d), 2: bottom (c-d), 3: left (a-c) where the corners are
+# a = (x0, y0), b = (x1, y0), c = (x0, y1), d = (x1, y1)
+# lookup table of the pairs of edges the contour passes through for each of the 16 cases, -1 means no segment
+SEGMENT_TABLE = np.array([
+    [[-1, -1], [-1, -1]],   # 0000 completely outside of the contour
+    [[1, 2], [-1, -1]],     # 0001
+    [[2, 3], [-1, -1]],     # 0010
+    [[3, 1], [-1, -1]],     # 0011
+    [[0, 1], [-1, -1]],     # 0100
+    [[0, 2], [-1, -1]],     # 0101
+    [[0, 3], [1, 2]],       # 0110 saddle, used when the centre is inside the contour
+    [[0, 3], [-1, -1]],     # 0111
+    [[0, 3], [-1, -1]],     # 1000
+    [[0, 1], [3, 2]],       # 1001 saddle, used when the centre is inside the contour
+    [[0, 2], [-1, -1]],     # 1010
+    [[0, 1], [-1, -1]],     # 1011
+    [[3, 1], [-1, -1]],     # 1100
+    [[2, 3], [-1, -1]],     # 1101
+    [[1, 2], [-1, -1]],     # 1110
+    [[-1, -1], [-1, -1]]    # 1111 completely inside of the contour
+])
+
+SADDLE_TABLE = {6: [[0, 1], [3, 2]], 9: [[0, 3], [1, 2]]}  # saddle segments used when the centre is outside
+
+
+def cell_index(va, vb, vc, vd):
+    # binary representation of the 4 corners (1 when the corner is inside the contour) converted to a decimal number
+    return (va < 0) * 8 + (vb < 0) * 4 + (vc < 0) * 2 + (vd < 0) * 1
+
+
+def cell_segments(x0, x1, y0, y1, va, vb, vc, vd, evaluate):
+    # every parameter is an array with one value per cell, evaluate is only needed for the centre of saddle cells
+    num = cell_index(va, vb, vc, vd)
+
+    with np.errstate(all="ignore"):  # invalid values are filtered out once all the segments have been found
+        # interpolates where the contour crosses every edge, edges are always interpolated in the direction of
+        # increasing x/y so neighbouring cells get exactly the same point for the edge they share
+        edge_x = np.stack([x0 + va / (va - vb) * (x1 - x0), x1, x0 + vc / (vc - vd) * (x1 - x0), x0], axis=1)
+        edge_y = np.stack([y0, y0 + vb / (vb - vd) * (y1 - y0), y1, y0 + va / (va - vc) * (y1 - y0)], axis=1)
+
+        pairs = SEGMENT_TABLE[num]  # (cells, 2, 2) edge pairs for every cell
+
+        saddle = np.nonzero((num == 6) | (num == 9))[0]
+        if len(saddle) > 0:  # need to check the centre value to see if the centre is included
+            centre = np.broadcast_to(evaluate((x0[saddle] + x1[saddle]) / 2, (y0[saddle] + y1[saddle]) / 2),
+                                     saddle.shape) < 0
+            for case, alternative in SADDLE_TABLE.items():
+                pairs[saddle[~centre & (num[saddle] == case)]] = alternative
+
+    cells, segment = np.nonzero(pairs[:, :, 0] >= 0)  # every cell/segment combination that has to be drawn
+    first = pairs[cells, segment, 0]
+    second = pairs[cells, segment, 1]
+
+    segments = np.stack([edge_x[cells, first], edge_y[cells, first],
+                         edge_x[cells, second], edge_y[cells, second]], axis=1)  # [[x1, y1, x2, y2]...]
+    return segments[np.isfinite(segments).all(axis=1)]  # skips segments where the function is undefined
+
+
+def grid_segments(evaluate, x, y):
+    xv, yv = np.meshgrid(x, y)  # creates grid of values to get all combinations of x/y
+    with np.errstate(all="ignore"):
+        values = np.broadcast_to(evaluate(xv, yv), xv.shape)  # the implicit function is evaluated once per point
+
+    num = cell_index(values[:-1, :-1], values[:-1, 1:], values[1:, :-1], values[1:, 1:])
+    i, j = np.nonzero((num != 0) & (num != 15))  # only cells on the border of the contour are needed
+
+    return cell_segments(x[j], x[j + 1], y[i], y[i + 1],
+                         values[i, j], values[i, j + 1], values[i + 1, j], values[i + 1, j + 1], evaluate)
+
+
+def quadtree_segments(evaluate, x_range, y_range, coarse_x, coarse_y, max_depth, max_cells, tolerance=0.5):
+    # starts from a coarse grid and only subdivides the cells the contour passes through where a straight segment
+    # isn't close enough to it, tolerance is in units of the smallest cells, cells that stop at different depths meet
+    # at T-junctions so stitch_segments needs a tolerance to join their segments up
+    x = np.linspace(x_range[0], x_range[1], coarse_x + 1)
+    y = np.linspace(y_range[0], y_range[1], coarse_y + 1)
+    xv, yv = np.meshgrid(x, y)
+    with np.errstate(all="ignore"):
+        values = np.broadcast_to(evaluate(xv, yv), xv.shape)
+
+    # every cell is stored as its corners and the values at its corners a = (x0, y0), b = (x1, y0), c = (x0, y1),
+    # d = (x1, y1)
+    x0, x1, y0, y1 = xv[:-1, :-1].ravel(), xv[:-1, 1:].ravel(), yv[:-1, :-1].ravel(), yv[1:, :-1].ravel()
+    va, vb = values[:-1, :-1].ravel(), values[:-1, 1:].ravel()
+    vc, vd = values[1:, :-1].ravel(), values[1:, 1:].ravel()
+    parent_spread = np.full(len(x0), np.inf)   # how much the values changed across the cell each cell was split from
+    num_cells = len(x0)     # number of cells that have been visited so far
+    leaves = []     # cells that the contour is drawn through, from every depth
+
+    for depth in range(max_depth + 1):
+        n = len(x0)
+        xc, yc = (x0 + x1) / 2, (y0 + y1) / 2
+        with np.errstate(all="ignore"):     # evaluates the centre and the midpoints of the top, right, bottom and left
+            # edges at once, they are the corners of the quarters if the cell is split
+            new = np.broadcast_to(evaluate(np.concatenate([xc, xc, x1, xc, x0]), np.concatenate([yc, y0, yc, y1, yc])),
+                                  (5 * n,))
+            centre, v_top, v_right, v_bottom, v_left = (new[i * n:(i + 1) * n] for i in range(5))
+            samples = np.stack([va, vb, vc, vd, centre, v_top, v_right, v_bottom, v_left])  # 9 known values of
+            # every cell
+
+            inside = samples < 0
+            finite = np.isfinite(samples)
+            sign_change = inside.any(axis=0) & ~inside.all(axis=0)
+            domain_edge = finite.any(axis=0) & ~finite.all(axis=0)  # the function stops being defined in the cell
+            spread = np.where(finite, samples, -np.inf).max(axis=0) - np.where(finite, samples, np.inf).min(axis=0)
+            # how far the contour can be from the straight segments through the cell, in units of the smallest cells,
+            # from how far the centre and the edge midpoints are from what linear interpolation gives, checking the
+            # edges means a cell that isn't split crosses its edges close to where a split neighbour's quarters do
+            linear = np.stack([(va + vb + vc + vd) / 4, (va + vb) / 2, (vb + vd) / 2, (vc + vd) / 2, (va + vc) / 2])
+            error = np.abs(samples[4:] - linear).max(axis=0) / spread * 2 ** (max_depth - depth)
+            flat = sign_change & ~domain_edge & (error <= tolerance)
+            # the values change by about half as much across a cell as across the cell it was split from, unless the
+            # function jumps inside it e.g. at an asymptote of tan(x) = y, where the sign changes without a contour
+            jump = sign_change & (spread > parent_spread) & (depth >= 2)
+            sign_change &= ~jump
+
+            split = (sign_change & ~flat) | domain_edge
+            if depth < 2 and num_cells + 4 * np.count_nonzero(split) <= max_cells:
+                # thin features that don't change the sign at any of the 5 samples can only be hiding in the big
+                # cells, where the values are close enough to 0 compared to how much they change
+                near_zero = np.where(finite, np.abs(samples), np.inf).min(axis=0) <= spread
+                split |= near_zero & ~flat
+            if depth == max_depth or num_cells + 4 * np.count_nonzero(split) > max_cells:
+                split = np.zeros_like(split)    # stops at the maximum depth or when the cell budget would be exceeded,
+                # every cell the contour is known to pass through is drawn as it is
+
+        leaf = sign_change & ~split
+        leaves.append([array[leaf] for array in (x0, x1, y0, y1, va, vb, vc, vd)])
+        if not split.any():
+            break
+        x0, x1, y0, y1, va, vb, vc, vd, xc, yc, centre, v_top, v_right, v_bottom, v_left, spread = (
+            array[split] for array in (x0, x1, y0, y1, va, vb, vc, vd, xc, yc, centre, v_top, v_right, v_bottom, v_left,
+                                       spread))
+        num_cells += 4 * len(x0)
+
+        # splits every cell into 4 quarters: top left, top right, bottom left, bottom right
+        x0, x1 = np.concatenate([x0, xc, x0, xc]), np.concatenate([xc, x1, xc, x1])
+        y0, y1 = np.concatenate([y0, y0, yc, yc]), np.concatenate([yc, yc, y1, y1])
+        va, vb, vc, vd = (np.concatenate([va, v_top, v_left, centre]), np.concatenate([v_top, vb, centre, v_right]),
+                          np.concatenate([v_left, centre, vc, v_bottom]), np.concatenate([centre, v_right, v_bottom, vd]))
+        parent_spread = np.tile(spread, 4)
+
+    return cell_segments(*(np.concatenate(arrays) for arrays in zip(*leaves)), evaluate)
+
+
+def stitch_segments(segments, tolerance=0):
+    # joins segments that share an endpoint into polylines, returns a list of (points, 2) arrays, if tolerance isn't 0
+    # loose ends closer than it are joined as well
+    if len(segments) == 0:
+        return []
+
+    # neighbouring cells produce exactly the same point for the edge they share, so endpoints can be matched exactly
+    points, ends = np.unique(segments.reshape(-1, 2), axis=0, return_inverse=True)
+    ends = ends.reshape(-1, 2)
+    if tolerance > 0:
+        ends = snap_ends(points, ends, tolerance)[ends]
+    ends = ends.tolist()     # [[start node, end node]...] for every segment
+
+    node_segments = [[] for _ in range(len(points))]    # segments connected to each node
+    for segment, (start, end) in enumerate(ends):
+        if start != end:    # segments with no length are skipped
+            node_segments[start].append(segment)
+            node_segments[end].append(segment)
+
+    used = [False] * len(ends)
+    polylines = []
+    for segment in range(len(ends)):
+        if used[segment] or ends[segment][0] == ends[segment][1]:
+            continue
+        used[segment] = True
+        chain = list(ends[segment])     # nodes of the polyline being built
+
+        for direction in range(2):  # walks forwards from the end of the chain then backwards from its start
+            node = chain[-1]
+            while chain[0] != chain[-1]:    # stops once the contour is a closed loop
+                next_segment = None
+                for option in node_segments[node]:  # finds an unused segment connected to the current node
+                    if not used[option]:
+                        next_segment = option
+                        break
+                if next_segment is None:    # the contour ends at this node
+                    break
+                used[next_segment] = True
+                start, end = ends[next_segment]
+                node = end if start == node else start
+                chain.append(node)
+
+            if chain[0] == chain[-1]:   # closed loops don't need to be walked backwards
+                break
+            chain.reverse()
+
+        polylines.append(points[chain])
+
+    return polylines
+
+
+def snap_ends(points, ends, tolerance):
+    # nodes that only one segment reaches are loose ends, e.g. where a cell meets a neighbour that was split more times
+    # and the contour crosses the edge they share at slightly different points, loose ends closer than tolerance are
+    # merged into one node, the closest pairs first, returns the node every node is merged into
+    degree = np.bincount(ends[ends[:, 0] != ends[:, 1]].ravel(), minlength=len(points))
+    loose = np.flatnonzero(degree == 1)
+    merged = np.arange(len(points))
+    if len(loose) < 2:
+        return merged
+
+    # loose ends are sorted into squares the size of the tolerance so only ends in neighbouring squares are compared
+    squares = np.floor(points[loose] / tolerance).astype(np.int64)
+    keys = squares[:, 0] * (2 ** 32) + squares[:, 1]
+    order = np.argsort(keys)
+    keys = keys[order]
+    first, second = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            lo = np.searchsorted(keys, keys + dx * (2 ** 32) + dy, side="left")
+            hi = np.searchsorted(keys, keys + dx * (2 ** 32) + dy, side="right")
+            counts = hi - lo
+            first.append(np.repeat(np.arange(len(keys)), counts))
+            second.append(np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum()))
+    first, second = loose[order[np.concatenate(first)]], loose[order[np.concatenate(second)]]
+    distance = np.hypot(*(points[first] - points[second]).T)
+    close = (first < second) & (distance <= tolerance)
+    first, second, distance = first[close], second[close], distance[close]
+
+    for i in np.argsort(distance, kind="stable").tolist():
+        a, b = first[i], second[i]
+        if merged[a] == a and merged[b] == b:   # each loose end is only merged once
+            merged[b] = a
+            merged[a] = -1 - a  # marks a as used without changing where it points
+    return np.where(merged < 0, -1 - merged, merged)
+
+
+if __name__ == "__main__":
+    circle = grid_segments(lambda x, y: (4) - (x ** 2 + y ** 2), np.linspace(-3, 3, 240), np.linspace(-3, 3, 128))
+    print(len(circle), np.abs(np.hypot(circle[:, 0], circle[:, 1]) - 2).max(), len(stitch_segments(circle)))
+    adaptive_circle = quadtree_segments(lambda x, y: (4) - (x ** 2 + y ** 2), [-3, 3], [-3, 3], 15, 8, 4, 100000)
+    print(len(adaptive_circle), len(stitch_segments(adaptive_circle)))
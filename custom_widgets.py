@@ -1,4 +1,5 @@
 import customtkinter as ctk
+from itertools import islice
 
 DEF_HEIGHT = int(1080 * 0.7)
 DEF_WIDTH = int(1920 * 0.7)
@@ -98,6 +99,9 @@ class DynamicScrollFrame(ctk.CTkCanvas):
 
         self.bind("<Configure>", self.update_size)  # binds re size event
 
+        # adds the base frame to the canvas, its size is changed by update_size
+        self.window = self.create_window((-2, -2), window=self.base_frame, anchor="nw")
+
     def update_size(self, event=None):
         width = self.winfo_width()  # gets width and height of the canvas
         height = self.winfo_height()
@@ -112,15 +116,108 @@ class DynamicScrollFrame(ctk.CTkCanvas):
             self.yview_moveto(0)    # scrolls back to the top to avoid
             self.scrollbar.place_forget()
 
-        self.create_window(  # adds the base frame to the canvas with the correct size
-            (-2, -2),
-            window=self.base_frame,
-            anchor="nw",
+        self.itemconfigure(  # gives the base frame the correct size
+            self.window,
             width=width+4,      # offset is needed due to prevent white outline from being visible
             height=container_height+4
         )
 
 
+class VirtualScrollFrame(ctk.CTkCanvas):
+    # scrollable list for any number of items, only enough item frames to fill the canvas are made and they are
+    # reused for whichever items are on screen as it scrolls, items are taken from the source a page at a time when
+    # they are about to be scrolled to
+    # the item class is made with item_class(parent, *item_params) and shows an item when its set_item method is called
+
+    def __init__(self, parent, item_class, item_pad_y, item_pad_x, item_size, item_params=(), page_size=50):
+        super(VirtualScrollFrame, self).__init__(master=parent, bg="gray14", highlightthickness=0)
+        self.pack(expand=True, fill="both")  # packs scrollable frame onto screen (can be overriden)
+
+        self.item_class = item_class
+        self.item_params = item_params
+        self.padding_y = item_pad_y  # padding for items
+        self.padding_x = item_pad_x
+        self.item_size = item_size   # pixels, including padding
+        self.page_size = page_size  # number of items taken from the source at once
+
+        self.items = []     # items that have been taken from the source so far
+        self.source = iter(())
+        self.exhausted = True   # whether every item has been taken from the source
+        self.rows = []  # [(item frame, canvas window id)...] reused for the items on screen
+        self.row_items = []     # index of the item each row is showing, None if it is hidden
+        self.width = 0
+        self.height = 0
+        self.scrollregion = None
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)  # creates scrollbar and
+        self.configure(yscrollcommand=self.on_scroll)   # adds scroll command
+
+        self.bind("<Configure>", self.update_size)  # binds re size event
+
+    def set_source(self, source):
+        # replaces the items with the ones in source, which can be any iterable e.g. a database cursor
+        if hasattr(self.source, "close"):   # the previous source won't be read from again
+            self.source.close()
+        self.source = iter(source)
+        self.items = []
+        self.exhausted = False
+        self.row_items = [None] * len(self.rows)    # every row needs to be set again
+        self.yview_moveto(0)
+        self.update_size()
+
+    def load(self, count):
+        # takes pages from the source until there are at least count items
+        while len(self.items) < count and not self.exhausted:
+            page = list(islice(self.source, self.page_size))
+            self.items += page
+            self.exhausted = len(page) < self.page_size
+
+    def update_size(self, event=None):
+        self.width = self.winfo_width()  # gets width and height of the canvas
+        self.height = self.winfo_height()
+
+        while len(self.rows) < self.height // self.item_size + 2:  # enough rows to fill the canvas when it is scrolled
+            row = self.item_class(self, *self.item_params)
+            self.rows.append((row, self.create_window((0, 0), window=row, anchor="nw", state="hidden")))
+            self.row_items.append(None)
+
+        self.update_rows()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.update_rows()
+
+    def update_rows(self):
+        first = max(0, int(self.canvasy(0) // self.item_size))  # index of the item at the top of the canvas
+        self.load(first + len(self.rows) + self.page_size)  # keeps a page ahead of what is on screen
+
+        width = self.width
+        total_height = self.item_size * len(self.items)
+        if total_height > self.height:  # if this is higher than the canvas height a scrollbar needs to be added
+            self.scrollbar.place(relx=1, rely=0, relheight=1, anchor="ne")
+            width -= 19  # adjusts rows so the scrollbar does not cover them
+        else:
+            total_height = self.height
+            self.scrollbar.place_forget()
+        if self.scrollregion != (0, 0, self.width, total_height):  # only changes when items are loaded or resized
+            self.scrollregion = (0, 0, self.width, total_height)
+            self.configure(scrollregion=self.scrollregion)
+
+        for index in range(first, first + len(self.rows)):
+            i = index % len(self.rows)  # each item always uses the same row so scrolling by one item only changes
+            row, window = self.rows[i]  # one row
+            if index >= len(self.items):
+                self.itemconfigure(window, state="hidden")
+                self.row_items[i] = None
+                continue
+            if self.row_items[i] != index:  # the row has been scrolled to a different item
+                row.set_item(self.items[index])
+                self.row_items[i] = index
+            self.coords(window, self.padding_x, index * self.item_size + self.padding_y)
+            self.itemconfigure(window, state="normal", width=width - 2 * self.padding_x,
+                               height=self.item_size - 2 * self.padding_y)
+
+
 class BaseFrame(ctk.CTkFrame):
 
     def __init__(self, parent, item_class, item_pad_y, item_pad_x, item_size):
@@ -133,10 +230,14 @@ class BaseFrame(ctk.CTkFrame):
         self.frames = []  # list of all frames
 
     def add(self, params=()):  # takes in parameters to pass into the item class init method
-        frame = self.item_class(self, *params)  # creates a frame with specified parameters
-        self.frames.append(frame)  # adds it to the list of all frames
-        frame.pack(expand=False, fill="x", pady=self.padding_y, padx=self.padding_x, side="top")  # adds item frame
-        self.num_items += 1  # increases item number accordingly
+        self.add_all([params])
+
+    def add_all(self, params_list):     # adds an item for each set of parameters with only one resize at the end
+        for params in params_list:
+            frame = self.item_class(self, *params)  # creates a frame with specified parameters
+            self.frames.append(frame)  # adds it to the list of all frames
+            frame.pack(expand=False, fill="x", pady=self.padding_y, padx=self.padding_x, side="top")  # adds item frame
+            self.num_items += 1  # increases item number accordingly
 
         expression_canvas = self.master   # navigates to the canvas the base frame is placed on
         expression_canvas.update_size()   # calls update size to check if the scrollbar needs to placed on the canvas
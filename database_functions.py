@@ -1,161 +1,405 @@
 import sqlite3
-
-
-def create_database():
-    conn = sqlite3.connect("saved_graphs.db")   # creates database
-
-    c = conn.cursor()   # initialises cursor
-    # executes query to create Graphs table
-    c.execute("""CREATE TABLE IF NOT EXISTS Graphs (
+import atexit
+import re
+from contextlib import contextmanager
+
+DATABASE = "saved_graphs.db"
+connection = None   # one connection is kept open and shared by every function in this module
+full_text_search = False    # whether graphs are searched with the FTS5 index or with LIKE, set when connecting
+data_version = 0    # increases every time a transaction is committed, so reads cached before then are out of date
+
+# columns of Graphs that each of the load screen's sort modes uses
+SORT_COLUMNS = ["name", "date_created", "date_modified"]
+
+# columns of a graph that are read for the load screen, graph_number is left out since it is only used to find graphs
+GRAPH_COLUMNS = "Graphs.graph_id, Graphs.name, Graphs.type, Graphs.date_created, Graphs.date_modified"
+
+# covering indexes for every sort mode on the load screen, with and without the mode filter, so the graphs can be read
+# in order without sorting or looking up the table
+SORT_INDEXES = [f"""CREATE INDEX IF NOT EXISTS Graphs_{column} ON Graphs
+                ({column}, {", ".join(other for other in ["graph_id", "name", "type", "date_created", "date_modified"]
+                                       if other != column)})""" for column in SORT_COLUMNS] + \
+               [f"""CREATE INDEX IF NOT EXISTS Graphs_type_{column} ON Graphs
+                (type, {column}, {", ".join(other for other in ["graph_id", "name", "date_created", "date_modified"]
+                                             if other != column)})""" for column in SORT_COLUMNS]
+
+# makes ASCII letters lower case and leaves every other character as it is, which is how LIKE ignores case
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# full text index of every graph's name and expressions, a row's rowid is the graph_number of its graph so it can be
+# found without scanning the index, prefix indexes make prefix queries of 2 and 3 characters faster
+SEARCH_INDEX = """CREATE VIRTUAL TABLE GraphSearch USING fts5(name, expressions, prefix='2 3')"""
+
+# expressions of a graph are indexed as one piece of text
+GRAPH_EXPRESSIONS = "(SELECT group_concat(expression_text, ' ') FROM Expressions WHERE graph_id = {}.graph_id)"
+
+# triggers that keep the index the same as the tables it is made from
+SEARCH_TRIGGERS = {
+    "GraphSearch_graph_insert": """AFTER INSERT ON Graphs BEGIN
+                INSERT INTO GraphSearch(rowid, name, expressions) VALUES (NEW.graph_number, NEW.name, '');
+        END""",
+    "GraphSearch_graph_update": """AFTER UPDATE OF name ON Graphs BEGIN
+                UPDATE GraphSearch SET name = NEW.name WHERE rowid = NEW.graph_number;
+        END""",
+    "GraphSearch_graph_delete": """AFTER DELETE ON Graphs BEGIN
+                DELETE FROM GraphSearch WHERE rowid = OLD.graph_number;
+        END""",
+    **{f"GraphSearch_expression_{event.lower()}": f"""AFTER {event} ON Expressions BEGIN
+                UPDATE GraphSearch SET expressions = {GRAPH_EXPRESSIONS.format(row)}
+                WHERE rowid = (SELECT graph_number FROM Graphs WHERE graph_id = {row}.graph_id);
+        END""" for event, row in [("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")]}
+}
+
+# each migration is a list of statements that takes the database from one version to the next, the version of the
+# database is stored in PRAGMA user_version so only the migrations it hasn't had yet are run
+MIGRATIONS = [
+    [   # version 1: the original tables, dates are in format YYYY-MM-DD
+        """CREATE TABLE IF NOT EXISTS Graphs (
                 graph_id TEXT PRIMARY KEY,
                 name TEXT,
                 type TEXT,
                 date_created DATE,
                 date_modified DATE
-    )""")
-
-    # dates are in format YYYY-MM-DD
-
-    # executes query to create Expressions table and sets up cascade delete restriction
-    c.execute("""CREATE TABLE IF NOT EXISTS Expressions (
+        )""",
+        """CREATE TABLE IF NOT EXISTS Expressions (
                 expression_id TEXT,
                 graph_id TEXT,
                 expression_text TEXT,
-                FOREIGN KEY(graph_id) REFERENCES Graphs(graph_id) ON DELETE CASCADE          
-    )""")
-
-    conn.commit()   # commits the transaction
-    conn.close()    # closes the database
-
-
-def delete_graph(graph_id):
-    conn = sqlite3.connect("saved_graphs.db")
+                FOREIGN KEY(graph_id) REFERENCES Graphs(graph_id) ON DELETE CASCADE
+        )"""
+    ],
+    [   # version 2: Expressions gets a primary key, expression ids are only unique within a graph since save as
+        # copies them, graph_id comes first so the key is also the index for finding a graph's expressions
+        """CREATE TABLE Expressions_new (
+                expression_id TEXT,
+                graph_id TEXT,
+                expression_text TEXT,
+                PRIMARY KEY(graph_id, expression_id),
+                FOREIGN KEY(graph_id) REFERENCES Graphs(graph_id) ON DELETE CASCADE
+        )""",
+        # keeps the order expressions were saved in, duplicates and expressions without a graph are dropped
+        """INSERT OR IGNORE INTO Expressions_new
+                SELECT expression_id, graph_id, expression_text FROM Expressions
+                WHERE graph_id IN (SELECT graph_id FROM Graphs)
+                ORDER BY rowid""",
+        "DROP TABLE Expressions",
+        "ALTER TABLE Expressions_new RENAME TO Expressions"
+    ],
+    SORT_INDEXES,   # version 3: the indexes for the load screen's sort modes
+    # version 4: Graphs gets an INTEGER PRIMARY KEY, the implicit rowid the search index and the load screen's paging
+    # used to find graphs by could be renumbered by VACUUM, graph_number is an alias of the rowid that never is, the
+    # search triggers are dropped first since they refer to Graphs, create_search_index makes them again
+    [f"DROP TRIGGER IF EXISTS {trigger}" for trigger in SEARCH_TRIGGERS] + [
+        """CREATE TABLE Graphs_new (
+                graph_number INTEGER PRIMARY KEY,
+                graph_id TEXT UNIQUE,
+                name TEXT,
+                type TEXT,
+                date_created DATE,
+                date_modified DATE
+        )""",
+        # graphs keep their rowids so the search index still matches them
+        """INSERT INTO Graphs_new (graph_number, graph_id, name, type, date_created, date_modified)
+                SELECT rowid, graph_id, name, type, date_created, date_modified FROM Graphs""",
+        "DROP TABLE Graphs",
+        "ALTER TABLE Graphs_new RENAME TO Graphs"
+    ] + SORT_INDEXES
+]
+
+
+def open_connection():
+    # isolation_level=None means sqlite3 doesn't open transactions on its own, transactions are started by
+    # transaction() instead, cached_statements keeps the compiled queries so they are reused on every call
+    conn = sqlite3.connect(DATABASE, isolation_level=None, cached_statements=256)
+    conn.execute("PRAGMA journal_mode = WAL")   # write ahead log, readers don't wait for writers
     conn.execute("PRAGMA foreign_keys = ON")    # acknowledges foreign keys to enforce referential integrity
+    return conn
+
+
+def get_connection():
+    global connection, full_text_search
+    if connection is None:  # connects the first time the database is used
+        connection = open_connection()
+        migrate()
+        full_text_search = create_search_index()
+    return connection
+
+
+def migrate():
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    # foreign keys are turned off while tables are rebuilt, otherwise dropping Graphs would delete every expression,
+    # they are checked before each migration is committed instead, the pragma can't be changed inside a transaction
+    connection.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for number in range(version, len(MIGRATIONS)):  # runs every migration the database hasn't had yet in order
+            with transaction() as c:
+                for statement in MIGRATIONS[number]:
+                    c.execute(statement)
+                if c.execute("PRAGMA foreign_key_check").fetchone() is not None:
+                    raise sqlite3.IntegrityError(f"migration {number + 1} broke a foreign key")
+                c.execute(f"PRAGMA user_version = {number + 1}")    # pragmas can't take parameters
+    finally:
+        connection.execute("PRAGMA foreign_keys = ON")
+
+
+def create_search_index():
+    # makes sure the search index exists and is up to date, returns False if this version of SQLite doesn't have FTS5
+    with transaction() as c:
+        if c.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'").fetchone() is None:
+            for trigger in SEARCH_TRIGGERS:     # the triggers would stop graphs from being saved without FTS5
+                c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            return False
+
+        c.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'GraphSearch%'")
+        if c.fetchone()[0] < len(SEARCH_TRIGGERS):  # the index is new or wasn't kept up to date, so it is rebuilt
+            c.execute("DROP TABLE IF EXISTS GraphSearch")
+            c.execute(SEARCH_INDEX)
+            c.execute(f"""INSERT INTO GraphSearch(rowid, name, expressions)
+                        SELECT graph_number, name, {GRAPH_EXPRESSIONS.format("Graphs")} FROM Graphs""")
+            for trigger, statement in SEARCH_TRIGGERS.items():
+                c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                c.execute(f"CREATE TRIGGER {trigger} {statement}")
+    return True
+
+
+def close_connection():
+    global connection
+    if connection is not None:
+        connection.close()
+        connection = None
+
+
+atexit.register(close_connection)   # closes the database when the program exits
+
+
+@contextmanager
+def transaction():
+    # every query run on the cursor inside the with block is committed together, or none of them are if there is an
+    # error, transactions inside another transaction become part of the outer one
+    conn = get_connection()
     c = conn.cursor()
+    if conn.in_transaction:
+        yield c
+        return
+    c.execute("BEGIN")
+    try:
+        yield c
+    except BaseException:
+        c.execute("ROLLBACK")
+        raise
+    c.execute("COMMIT")
+    global data_version
+    data_version += 1
 
-    # gets rid of graph record with passed id
-    c.execute("""DELETE FROM Graphs
-                WHERE graph_id = ?
-    """, (graph_id,))   # delete query using sqlite to pass in values- must be in a tuple
 
-    conn.commit()
-    conn.close()
+def create_database():
+    get_connection()    # the tables are created by the migrations when the database is first connected to
 
 
-def add_graph(graph_id, graph_title, g_type, date_created, date_modified):
-    conn = sqlite3.connect("saved_graphs.db")
-    c = conn.cursor()
+def delete_graph(graph_id):
+    with transaction() as c:
+        # gets rid of graph record with passed id, its expressions are deleted by the cascade
+        c.execute("""DELETE FROM Graphs
+                    WHERE graph_id = ?
+        """, (graph_id,))   # delete query using sqlite to pass in values- must be in a tuple
 
-    c.execute("""SELECT graph_id FROM Graphs
-                WHERE graph_id = ?
-    """, (graph_id,))   # query to see if any graphs exist with entered ID
 
-    if len(c.fetchall()) == 0:  # validation to check if the graph already exists
-        c.execute("INSERT INTO Graphs VALUES (?, ?, ?, ?, ?)", (graph_id, graph_title, g_type, date_created,
-                                                                date_modified))
+def add_graph(graph_id, graph_title, g_type, date_created, date_modified):
+    with transaction() as c:
+        c.execute("""SELECT graph_id FROM Graphs
+                    WHERE graph_id = ?
+        """, (graph_id,))   # query to see if any graphs exist with entered ID
 
-    conn.commit()
-    conn.close()
+        if len(c.fetchall()) == 0:  # validation to check if the graph already exists
+            c.execute("""INSERT INTO Graphs (graph_id, name, type, date_created, date_modified)
+                        VALUES (?, ?, ?, ?, ?)
+                """, (graph_id, graph_title, g_type, date_created, date_modified))   # graph_number is given by SQLite
 
 
 def add_expressions(expressions):   # expressions = [(expression_id, graph_id, expression_text)...]
-    conn = sqlite3.connect("saved_graphs.db")
-    conn.execute("PRAGMA foreign_keys = ON")    # prevents referential integrity from being violated
-    c = conn.cursor()
-
-    c.executemany("INSERT INTO Expressions VALUES (?, ?, ?)", expressions)  # adds all expressions
-
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.executemany("INSERT INTO Expressions VALUES (?, ?, ?)", expressions)  # adds all expressions
 
 
 def save_as(graph_id, graph_title, g_type, date_created, date_modified, expressions):
-    add_graph(graph_id, graph_title, g_type, date_created, date_modified)   # new graph record needs to be created
-    add_expressions(expressions)    # new expressions are added
+    with transaction():     # the graph and its expressions are saved together
+        add_graph(graph_id, graph_title, g_type, date_created, date_modified)   # new graph record needs to be created
+        add_expressions(expressions)    # new expressions are added
 
 
 def update_graph(graph_id, graph_title, date_modified):
-    conn = sqlite3.connect("saved_graphs.db")
-    conn.execute("PRAGMA foreign_keys = ON")    # enforces ref integrity
-    c = conn.cursor()
-    c.execute("SELECT graph_id FROM Graphs WHERE graph_id = ?", (graph_id,))    # query to check if graph exists
+    with transaction() as c:
+        c.execute("SELECT graph_id FROM Graphs WHERE graph_id = ?", (graph_id,))    # query to check if graph exists
 
-    if len(c.fetchall()) == 0:  # checks if graph exists
-        conn.commit()   # closes data base
-        conn.close()
-        return False
+        if len(c.fetchall()) == 0:  # checks if graph exists
+            return False
 
-    c.execute("""UPDATE Graphs SET date_modified = ?, name = ?
-                WHERE graph_id = ?
-    """, (date_modified, graph_title, graph_id))    # query to update graph records with the new data
-
-    conn.commit()
-    conn.close()
+        c.execute("""UPDATE Graphs SET date_modified = ?, name = ?
+                    WHERE graph_id = ?
+        """, (date_modified, graph_title, graph_id))    # query to update graph records with the new data
 
 
 def update_expressions(graph_id, expressions):
-    conn = sqlite3.connect("saved_graphs.db")
-    c = conn.cursor()
-
-    # deletes all old expressions in database
-    c.execute("""DELETE FROM Expressions
-                WHERE graph_id = ?
-        """, (graph_id,))
-
-    conn.commit()
-    conn.close()
-
-    # adds all the new expressions
-    add_expressions(expressions)
+    # compares the expressions with the ones that are saved and only adds, changes or deletes the ones that are
+    # different
+    with transaction() as c:
+        c.execute("""SELECT expression_id, expression_text
+                    FROM Expressions
+                    WHERE graph_id = ?
+            """, (graph_id,))
+        saved = dict(c.fetchall())  # {expression_id: expression_text}
+        new = {expression_id: expression_text for expression_id, g_id, expression_text in expressions}
+
+        c.executemany("INSERT INTO Expressions VALUES (?, ?, ?)",
+                      [expression for expression in expressions if expression[0] not in saved])
+        c.executemany("""UPDATE Expressions SET expression_text = ?
+                        WHERE expression_id = ? AND graph_id = ?
+            """, [(expression_text, expression_id, graph_id) for expression_id, expression_text in new.items()
+                  if expression_id in saved and saved[expression_id] != expression_text])
+        c.executemany("""DELETE FROM Expressions
+                        WHERE expression_id = ? AND graph_id = ?
+            """, [(expression_id, graph_id) for expression_id in saved if expression_id not in new])
 
 
 def save(graph_id, graph_title, date_modified, expressions):
-    if update_graph(graph_id, graph_title, date_modified) is not None:  # updates graph and checks if it exists
-        return False
-    update_expressions(graph_id, expressions)
+    with transaction():     # the graph and its expressions are updated together so a crash can't lose expressions
+        if update_graph(graph_id, graph_title, date_modified) is not None:  # updates graph and checks if it exists
+            return False
+        update_expressions(graph_id, expressions)
+
+
+def search_query(search_item):
+    # turns the search item into an FTS5 query that matches graphs containing words starting with every word in it
+    # e.g. sin gr -> "sin"* "gr"*, quotes stop characters like - and ( from being read as FTS5 syntax, words without
+    # letters or digits can't be matched by the index so they are left out
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in search_item.split()
+                    if any(character.isalnum() for character in word))
+
+
+def uses_index(search_item):
+    # whether find_graphs searches for the search item with the FTS5 index or with LIKE
+    return full_text_search and bool(search_query(search_item))
+
+
+def text_tokens(text):
+    # splits text into lowercase words the same way the FTS5 index does, anything that isn't a letter or digit
+    # separates words
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def phrase_in(phrase, words):
+    # whether the words contain the phrase, the last word of the phrase only has to be the start of a word like a
+    # prefix query
+    length = len(phrase)
+    return any(words[i:i + length - 1] == phrase[:-1] and words[i + length - 1].startswith(phrase[-1])
+               for i in range(len(words) - length + 1))
+
+
+def graph_matches(search_item, name, expressions):
+    # checks whether find_graphs would find a graph with this name and expressions, expressions are separated by new
+    # lines as they are given by graph_texts, used to narrow down results that are already known without a query
+    expressions = expressions or ""
+    if uses_index(search_item):     # every word has to be a phrase in the name or in the expressions
+        columns = [text_tokens(name), text_tokens(expressions)]
+        phrases = [text_tokens(word) for word in search_item.split()]
+        return all(any(phrase_in(phrase, column) for column in columns) for phrase in phrases if phrase)
+    search_item = search_item.translate(ASCII_LOWER)    # LIKE only ignores the case of ASCII letters
+    return (not search_item.strip() or search_item in name.translate(ASCII_LOWER) or
+            search_item in expressions.translate(ASCII_LOWER))
+
+
+def can_narrow(search_item, texts):
+    # whether graph_matches gives the same answer as find_graphs for every (name, expressions) in texts, the FTS5
+    # index also ignores the case and the accents of letters that aren't ASCII in ways text_tokens can't copy exactly,
+    # so searches that use the index can only be narrowed down when all of the text is ASCII
+    if not uses_index(search_item):
+        return True
+    return search_item.isascii() and all(name.isascii() and (expressions or "").isascii()
+                                         for name, expressions in texts)
+
+
+def find_graphs(search_item, sort_by, mode, conn=None, numbers=False):
+    # finds all graphs whose name or expressions match the search item, sort_by is a field name or "rank" which puts
+    # the best matches first, mode is "all" or the type of graph to get
+    # returns the cursor so the graphs can be read a few at a time as they are needed, the query can be run on
+    # another thread with a connection from open_connection, if numbers is True only the graph_number of each graph
+    # is read so the graphs can be read later with read_graphs
+    c = (conn or get_connection()).cursor()     # reads don't need a transaction
+
+    columns = "Graphs.graph_number" if numbers else GRAPH_COLUMNS
+    tables = "Graphs"
+    conditions, parameters = [], []
+    if uses_index(search_item):
+        if sort_by == "rank":   # matches in the name count for more than matches in the expressions
+            # CROSS JOIN makes SQLite go through the matches first instead of matching every graph one at a time
+            tables = "GraphSearch CROSS JOIN Graphs ON Graphs.graph_number = GraphSearch.rowid"
+            conditions.append("GraphSearch MATCH ?")
+            sort_by = "bm25(GraphSearch, 10.0, 1.0)"
+        else:   # the matches are found once and then read in order from the sort mode's index
+            conditions.append("Graphs.graph_number IN (SELECT rowid FROM GraphSearch WHERE GraphSearch MATCH ?)")
+        parameters.append(search_query(search_item))
+    elif search_item.strip():   # without FTS5 the search item has to be a substring of the name or an expression
+        conditions.append("""(name LIKE ? ESCAPE '\\' OR graph_id IN (SELECT graph_id FROM Expressions
+                                                                     WHERE expression_text LIKE ? ESCAPE '\\'))""")
+        # % and _ are escaped so they are searched for instead of being wildcards
+        pattern = search_item.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        parameters += ["%" + pattern + "%"] * 2
+    if sort_by == "rank":   # nothing to rank by so graphs are sorted by name
+        sort_by = "name"
+
+    if mode != "all":   # otherwise the type of the graph has to be specified in the query
+        conditions.append("type = ?")
+        parameters.append(mode)
+
+    # sort_by needs to added explicitly due to it being a field name, so it would be filtered out by SQLite3
+    c.execute(f"""SELECT {columns} FROM {tables}
+                {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY {sort_by}
+        """, parameters)
+
+    return c
 
 
 def get_graphs(search_item, sort_by, mode):
-    conn = sqlite3.connect("saved_graphs.db")
-    c = conn.cursor()
+    return find_graphs(search_item, sort_by, mode).fetchall()  # gets all records that match the search criteria
+
+
+def find_by_number(numbers, columns=GRAPH_COLUMNS, conn=None):
+    # reads the columns of the graphs with the given graph_numbers in the same order, graphs that have been deleted
+    # since their numbers were found are skipped
+    c = (conn or get_connection()).cursor()
+    rows = {}
+    for start in range(0, len(numbers), 500):   # older versions of SQLite only allow 999 parameters in a query
+        chunk = numbers[start:start + 500]
+        c.execute(f"SELECT graph_number, {columns} FROM Graphs WHERE graph_number IN ({', '.join('?' * len(chunk))})",
+                  chunk)
+        rows.update((row[0], row[1:]) for row in c)
+    return [rows[number] for number in numbers if number in rows]
 
-    search_item = "%" + search_item + "%"   # checks if search item is a substring of the name
-    # gets all graphs where the search item is a substring
-    if mode == "all":   # if searching from all modes then the search query does not need extra criteria
-        # sort_by needs to added explicitly due to it being a field name, so it would be filtered out by SQLite3
-        c.execute(f"""SELECT * FROM Graphs
-                    WHERE name LIKE ?
-                    ORDER BY {sort_by}
-        """, (search_item,))
-    else:   # otherwise the type of the graph has to be specified in the query
-        c.execute(f"""SELECT * FROM Graphs
-                    WHERE name LIKE ? AND type = ?
-                    ORDER BY {sort_by}
-        """, (search_item, mode))
 
-    results = c.fetchall()  # gets all records that match the search criteria
+def read_graphs(numbers, page_size=50):
+    # reads the graphs found by find_graphs a page at a time as they are needed
+    for start in range(0, len(numbers), page_size):
+        yield from find_by_number(numbers[start:start + page_size])
 
-    conn.commit()
-    conn.close()
 
-    return results
+def graph_texts(numbers, conn=None):
+    # gets (name, expressions) of each graph for graph_matches, expressions are separated by new lines
+    return find_by_number(numbers, "name, (SELECT group_concat(expression_text, char(10)) FROM Expressions "
+                                   "WHERE graph_id = Graphs.graph_id)", conn)
 
 
 def get_expressions(graph_id):
-    conn = sqlite3.connect("saved_graphs.db")
-    c = conn.cursor()
+    c = get_connection().cursor()
 
-    # gets the id and the text of all expressions belonging to the graph
+    # gets the id and the text of all expressions belonging to the graph in the order they were saved
     c.execute("""SELECT expression_id, expression_text
                 FROM Expressions
                 WHERE graph_id = ?
+                ORDER BY rowid
         """, (graph_id,))
 
-    results = c.fetchall()  # returns a list of all expression ids and text
-    conn.commit()
-    conn.close()
-
-    return results
+    return c.fetchall()  # returns a list of all expression ids and text
 
 
 if __name__ == "__main__":
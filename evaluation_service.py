@@ -0,0 +1,64 @@
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EvaluationService:
+    # evaluates expressions on worker threads so the window stays responsive, results are passed back to the tkinter
+    # thread through a queue that is polled with after, since widgets can only be changed from the tkinter thread
+    poll_delay = 10     # ms between checks for finished jobs
+
+    def __init__(self, widget, workers=None):
+        self.widget = widget    # widget used to schedule polling on the tkinter thread
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.results = queue.Queue()    # (key, future) pairs of finished jobs
+        self.jobs = {}  # key: (future, callback) of the newest job for each key
+        self.poll_job = None    # id of the scheduled poll
+
+    def submit(self, key, job, callback):
+        # job is run on a worker thread and callback is called with its future on the tkinter thread, unless it is
+        # cancelled first, a newer job for the same key or a change to the viewport cancels it
+        self.cancel(key)    # the previous job for this key is out of date
+        future = self.executor.submit(job)
+        self.jobs[key] = (future, callback)
+        future.add_done_callback(lambda done: self.results.put((key, done)))  # called on the worker thread
+
+        if self.poll_job is None:   # starts polling if it isn't already happening
+            self.poll_job = self.widget.after(self.poll_delay, self.poll)
+
+    def cancel(self, key):
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job[0].cancel()     # stops the job if it hasn't started yet, otherwise its result is dropped
+
+    def invalidate(self):
+        # called when the viewport changes, every pending job was calculated for the old viewport so is dropped
+        for key in list(self.jobs):
+            self.cancel(key)
+
+    def poll(self):
+        self.poll_job = None
+        try:
+            while True:
+                try:
+                    key, future = self.results.get_nowait()
+                except queue.Empty:
+                    break
+
+                job = self.jobs.get(key)
+                if job is None or job[0] is not future:     # the job was cancelled or a newer job has replaced it
+                    continue
+                self.jobs.pop(key)
+                job[1](future)
+        finally:    # keeps polling while there are jobs left, even if a callback fails
+            if self.jobs and self.poll_job is None:
+                self.poll_job = self.widget.after(self.poll_delay, self.poll)
+
+    def shutdown(self):
+        if self.poll_job is not None:
+            self.widget.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.jobs = {}
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -2,162 +2,183 @@ import numpy as np  # numpy is needed for array processing
 import math
 from string_conversion import expression_to_function, vector_expression_to_function
 # imports expression_to_function for the create_expression function
-
-cartesian_range = {"x": [], "y": []}    # initialises range
-polar_range = {"x": [], "y": []}    # here "x" references theta and "y" references r
-
-
-def get_range(corners):  # corners = [top_left, bottom_right]
-    global cartesian_range
-    global polar_range
-
-    x_range = [corners[0][0], corners[1][0]]    # range of x vals
-    cartesian_range["x"] = x_range
-    y_range = [corners[1][1], corners[0][1]]    # range of y vals
-    cartesian_range["y"] = y_range
-
-    theta_range = [0, 2*np.pi]  # range of theta vals
-    polar_range["x"] = theta_range
-    r_max = np.sqrt((x_range[0] - x_range[1])**2 + (y_range[0]-y_range[1])**2) / 2  # gets length of
-    # screen diagonal and divides it by 2
-    r_range = [-r_max, r_max]    # range of r vals
-    polar_range["y"] = r_range
+from contour_algorithms import grid_segments, quadtree_segments, stitch_segments
+from sampling_algorithms import adaptive_sample, find_breaks, split_curve
+from caching import LRUCache, MISSING
+from streamline_algorithms import streamlines
+
+# Parameters for string parsing, functions and constants are given the numpy functions/values they are compiled to
+FUNCTIONS = {
+    "ln": np.log, "abs": np.abs,
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "csc": lambda a: 1 / np.sin(a), "sec": lambda a: 1 / np.cos(a), "cot": lambda a: 1 / np.tan(a),
+    "sqrt": np.sqrt,
+    "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh,
+    "arcsin": np.arcsin, "arccos": np.arccos, "arctan": np.arctan,
+    "arcsinh": np.arcsinh, "arccosh": np.arccosh, "arctanh": np.arctanh
+}
+CONSTANTS = {"e": np.e, "π": np.pi}
+NUMBERS = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+
+GRAMMAR_VERSION = 3     # part of every cache key, needs to be increased whenever the parsing rules change so old
+# cached expressions aren't used
+expression_cache = LRUCache(256)    # parsed expression objects (or False for invalid text) by their normalised text
+geometry_cache = LRUCache(max_size=32 * 1024 ** 2)  # lines calculated for each expression and viewport, the size
+# is an estimate of the bytes used
+
+
+def lines_key(expression, viewport):
+    # expression objects are reused for the same text so the object identifies the expression, its plot settings
+    # change what is drawn for the same expression
+    return expression, expression.plot_settings(), viewport.cache_key()
+
+
+def calculate_lines(expression, viewport):
+    # calculates the lines for an expression and caches them, the viewport can't change while this runs on a worker
+    # thread but settings shared by a whole class of expressions can
+    key = lines_key(expression, viewport)
+    lines = expression.get_lines(viewport)
+    if lines_key(expression, viewport) == key:  # the settings didn't change while the lines were being calculated
+        size = sum(len(coords) for coords, options in lines) * 32 + len(lines) * 128    # a float in a list takes
+        geometry_cache.put(key, lines, size)    # up 32 bytes
+    return lines
+
+
+def draw_lines(canvas, lines, frame_id, colour, add=False):
+    # lines = [(coords, options)...] as calculated by an expression's get_lines method, this is the only part of
+    # plotting that has to happen on the main thread, the lines replace the expression's graph unless add is True
+    # e.g. for strips
+    layer = canvas.plot_layer(frame_id)
+    # every line is given the same options so a line that is reused for an arrow or a streamline is fully changed
+    shapes = [(coords, {"fill": colour, "width": 3, "arrow": "none", **options}) for coords, options in lines]
+    if add:
+        layer.add(shapes)
+    else:
+        layer.update(shapes)
+    layer.show()    # the graph may have been hidden or in an error state
 
 
 class Expression:  # explicit functions with one variable
     range = None
+    pixel_tolerance = 0.5   # how far in pixels the drawn line can be from the curve before more samples are taken
 
     def __init__(self, p_function, p_vars):
         self.function = p_function  # sets function and variable parameters
         self.variables = p_vars
 
-    def get_points(self, p_range, num_samples):
-        x = np.linspace(p_range[0], p_range[1], num_samples)  # creates array of x values
+    def evaluate(self, x):
         # calculates y values
         if len(self.variables) > 0:  # exception for if user enters a constant
-            y = self.function(x)   # if function takes parameters they are passed
-        else:
-            y = self.function() * (x * 0 + 1)
-            # otherwise None are passed and the result is multiplied by an array of 1s
-
-        mask = np.logical_not(np.isnan(y) | np.isinf(y))  # validation to get rid of invalid y values
-        x = x[mask]
-        y = y[mask]
-        return x, y   # returns x/y values
+            return self.function(x)   # if function takes parameters they are passed
+        return self.function() * (x * 0 + 1)
+        # otherwise None are passed and the result is multiplied by an array of 1s
+
+    def get_points(self, p_range, num_samples, tolerance=None, limit=None):
+        if tolerance is None:
+            x = np.linspace(p_range[0], p_range[1], num_samples)  # creates array of x values
+            with np.errstate(all="ignore"):
+                y = self.evaluate(x)
+        else:   # num_samples is only the coarse pass, more samples are added where the curve needs them
+            x, y = adaptive_sample(self.evaluate, p_range[0], p_range[1], num_samples, tolerance, self.to_cartesian,
+                                   limit)
+        return x, y   # returns x/y values, invalid y values are kept so the gaps in the curve can be found
+
+    def get_curves(self, viewport, p_range, num_samples, tolerance, limit):
+        inputs, values = self.get_points(p_range, num_samples, tolerance, limit)
+        with np.errstate(all="ignore"):
+            x, y = self.to_cartesian(inputs, values)
+        # splits the curve at asymptotes/discontinuities and wherever it is undefined
+        return split_curve(x, y, find_breaks(x, y, inputs, values, 1 / viewport.resolution, limit))
 
     @staticmethod
-    def plot_points(canvas, x_coords, y_coords, frame_id, colour):
-        x = canvas.plane_to_win_x(x_coords)  # converts x/y coords to window coords
-        y = canvas.plane_to_win_y(y_coords)
+    def to_cartesian(x, y):
+        return x, y     # points are already in cartesian coords
 
-        canvas.create_line(tuple((x[i], y[i]) for i in range(0, len(x))), tags=("plot", str(frame_id)), fill=colour,
-                           width=3)  # pairs up x/y coords and draws the graph
-        canvas.__class__.graphs.add(frame_id)  # adds new frame id since new graph is on the plane
+    def get_curve_lines(self, viewport, x_range):
+        tolerance = self.pixel_tolerance / viewport.resolution  # converts the tolerance into plane units
+        y_range = viewport.cartesian_range["y"]
+        limit = max(abs(y_range[0]), abs(y_range[1]))  # y values past this are off screen
+        curves = self.get_curves(viewport, x_range, 32, tolerance, limit)
+        return [(coords, {}) for coords in viewport.window_lines(curves)]
 
-    def plot(self, canvas, frame_id, colour):
-        x, y = self.get_points(cartesian_range["x"], 500)  # calculates and plots points
-        self.plot_points(canvas, x, y, frame_id, colour)
+    def get_lines(self, viewport):  # calculates the lines that need to be drawn to plot the graph
+        return self.get_curve_lines(viewport, viewport.cartesian_range["x"])
+
+    @staticmethod
+    def plot_settings():
+        return ()   # nothing changes how the curve is plotted
+
+    def get_strip_lines(self, viewport, x_strip, y_strip):
+        # lines for the parts of the graph in the strips of the plane that have just come onto the screen while panning
+        if x_strip is not None:  # curves aren't cut off at the top and bottom of the screen so only new x values
+            return self.get_curve_lines(viewport, x_strip)  # need to be plotted
+        return []
 
 
 class Mapping:
+    # the settings are shared by every mapping since mapping objects are shared by every frame with the same text,
+    # adaptive is switched on the graphing screen's toolbar, max_depth and cells_per_pixel are only changed in the code
+    adaptive = False    # when True the quadtree is used instead of the fixed grid
+    max_depth = 4   # number of times a cell can be subdivided, the coarse grid is sized so the smallest cells are
+    # 1 pixel wide
+    cells_per_pixel = 1 / 64    # number of cells the quadtree can visit for each pixel of the area being plotted, about
+    # as many as the fixed grid has
 
-    def __init__(self, p_functions, p_vars):
-        self.function = p_functions  # sets function and variable parameters
+    def __init__(self, p_function, p_vars):
+        self.function = p_function  # implicit function, (rhs) - (lhs) of the mapping
         self.variables = p_vars
 
-    def marching_squares(self, p_range, canvas, frame_id, colour):
-
-        x = np.linspace(p_range["x"][0], p_range["x"][1], 240)  # 240 samples
-        y = np.linspace(p_range["y"][0], p_range["y"][1], 128)  # 128 samples
-        xv, yv = np.meshgrid(x, y)  # creates grid of values to get all combinations of x/y
-        condition = self.function[0]
-        evaluate = self.function[1]
-
-        mask = condition(xv, yv).astype(int)  # 1 when point is inside the contour and 0 when outside
-
-        for i in range(0, 128 - 1):  # loops through all x and y vals
-            for j in range(0, 240 - 1):
-                num = mask[i, j] * 8 + mask[i, j + 1] * 4 + mask[i + 1, j] * 2 + mask[i + 1, j + 1] * 1  # binary
-                # representation of 4 grid points converted to a decimal number for selection statements
-                p1, p2, p3, p4 = None, None, None, None  # intialises points
-                if num == 0 or num == 15:  # 0000 or 1111 (completely inside or outside of mapping contour)
-                    continue
-                # all cases where points are on the border
-                elif num == 1 or num == 14:  # 0001 or 1110
-                    p1 = self.interpolate(evaluate, (xv[i + 1, j + 1], yv[i + 1, j + 1]), (xv[i + 1, j], yv[i + 1, j]))
-                    p2 = self.interpolate(evaluate, (xv[i + 1, j + 1], yv[i + 1, j + 1]), (xv[i, j + 1], yv[i, j + 1]))
-
-                elif num == 2 or num == 13:  # 0010 or 1101
-                    p1 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]), (xv[i + 1, j + 1], yv[i + 1, j + 1]))
-                    p2 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]), (xv[i, j], yv[i, j]))
-
-                elif num == 3 or num == 12:  # 0011 or 1100
-                    p1 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]), (xv[i, j], yv[i, j]))
-                    p2 = self.interpolate(evaluate, (xv[i + 1, j + 1], yv[i + 1, j + 1]), (xv[i, j + 1], yv[i, j + 1]))
-
-                elif num == 4 or num == 11:  # 0100 or 1011
-                    p1 = self.interpolate(evaluate, (xv[i, j + 1], yv[i, j + 1]), (xv[i, j], yv[i, j]))
-                    p2 = self.interpolate(evaluate, (xv[i, j + 1], yv[i, j + 1]), (xv[i + 1, j + 1], yv[i + 1, j + 1]))
-
-                elif num == 5 or num == 10:  # 0101 or 1010
-                    p1 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i, j + 1], yv[i, j + 1]))
-                    p2 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]), (xv[i + 1, j + 1], yv[i + 1, j + 1]))
-
-                elif num == 6 or num == 9:  # 0110  need to check center value to see if centre is included
-                    centre = condition((xv[i, j] + xv[i + 1, j + 1]) / 2, (yv[i, j] + yv[i + 1, j + 1]) / 2)
-                    if (centre and num == 6) or (not centre and num == 9):
-                        p1 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i + 1, j], yv[i + 1, j]))
-                        p2 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i, j + 1], yv[i, j + 1]))
-                        p3 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]),
-                                              (xv[i + 1, j + 1], yv[i + 1, j + 1]))
-                        p4 = self.interpolate(evaluate, (xv[i + 1, j + 1], yv[i + 1, i + 1]),
-                                              (xv[i, j + 1], yv[i, j + 1]))
-                    elif (centre and num == 9) or (not centre and num == 6):
-                        p1 = self.interpolate(evaluate, (xv[i + 1, j + 1], yv[i + 1, j + 1]),
-                                              (xv[i, j + 1], yv[i, j + 1]))
-                        p2 = self.interpolate(evaluate, (x[i, j], yv[i, j]), (xv[i, j + 1], yv[i, j + 1]))
-                        p3 = self.interpolate(evaluate, (xv[i + 1, j], yv[i + 1, j]),
-                                              (xv[i + 1, j + 1], yv[i + 1, j + 1]))
-                        p4 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i + 1, j], yv[i + 1, j]))
-
-                elif num == 7 or num == 8:  # 0111 or 1000
-                    p1 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i, j + 1], yv[i, j + 1]))
-                    p2 = self.interpolate(evaluate, (xv[i, j], yv[i, j]), (xv[i + 1, j], yv[i + 1, j]))
-
-                if p1 is not None and p2 is not None:  # checks if points have been calculated
-                    p1 = canvas.plane_to_win(p1)
-                    p2 = canvas.plane_to_win(p2)
-                    canvas.create_line((p1, p2), tags=("plot", str(frame_id)), fill=colour, width=3)
-
-                if p3 is not None and p4 is not None:  # checks if points have been calculated
-                    p3 = canvas.plane_to_win(p3)    # converts the points into window coordinates and
-                    p4 = canvas.plane_to_win(p4)    # draws a line connecting them
-                    canvas.create_line((p3, p4), tags=("plot", str(frame_id)), fill=colour, width=3)
-
-        canvas.__class__.graphs.add(frame_id)  # adds new frame id since new graph is on the plane
-
-    def interpolate(self, evaluate, point1, point2):
-        try:
-            v1 = evaluate(point1[0], point1[1])  # Where vn is pointn evaluated at the implicit function used to
-            v2 = evaluate(point2[0], point2[1])  # define the mapping
-        except RuntimeError:    # exceptions for invalid values
-            return None         # skips point if invalid
-        except RuntimeWarning:
-            return None
-        except ZeroDivisionError:
-            return None
-
-        if np.isnan(v1) or np.isnan(v2) or np.isinf(v1) or np.isinf(v2):
-            # validation to check if the implicit function is defined at point1/2
-            return None
-
-        new_x = point1[0] - v1 / (v2 - v1) * (point2[0] - point1[0])  # interpolates between points
-        new_y = point1[1] - v1 / (v2 - v1) * (point2[1] - point1[1])
-        new_point = (new_x, new_y)  # returns new point
-        return new_point
-
-    def plot(self, canvas, frame_id, colour):
-        self.marching_squares(cartesian_range, canvas, frame_id, colour)
+    def condition(self, x, y):
+        return self.function(x, y) < 0  # points inside the contour, the same evaluation gives both
+
+    def marching_squares(self, p_range, viewport, fraction=(1, 1)):
+        # fraction is how much of the screen's width and height p_range covers, so the cells stay the same size when
+        # only part of the screen is plotted
+        evaluate = self.function
+
+        if self.adaptive:
+            coarse_x = max(math.ceil(viewport.width * fraction[0] / 2 ** self.max_depth), 1)  # number of cells in
+            coarse_y = max(math.ceil(viewport.height * fraction[1] / 2 ** self.max_depth), 1)  # the coarse grid
+            max_cells = math.ceil(self.cells_per_pixel * viewport.width * fraction[0] * viewport.height * fraction[1])
+            segments = quadtree_segments(evaluate, p_range["x"], p_range["y"], coarse_x, coarse_y, self.max_depth,
+                                         max_cells)
+            # cells of different sizes meet at T-junctions where the ends of their segments don't quite match, ends up
+            # to 2 of the smallest cells apart are joined
+            tolerance = 2 * max((p_range["x"][1] - p_range["x"][0]) / coarse_x,
+                                (p_range["y"][1] - p_range["y"][0]) / coarse_y) / 2 ** self.max_depth
+        else:
+            x = np.linspace(p_range["x"][0], p_range["x"][1], max(math.ceil(239 * fraction[0]), 1) + 1)  # 240 samples
+            y = np.linspace(p_range["y"][0], p_range["y"][1], max(math.ceil(127 * fraction[1]), 1) + 1)  # 128 samples
+            segments = grid_segments(evaluate, x, y)  # [[x1, y1, x2, y2]...] for every segment of the contour
+            tolerance = 0   # every cell is the same size so the ends of neighbouring segments match exactly
+
+        # each connected part of the contour is drawn as one line
+        curves = [self.to_cartesian(polyline[:, 0], polyline[:, 1])
+                  for polyline in stitch_segments(segments, tolerance)]
+        return [(coords, {}) for coords in viewport.window_lines(curves)]
+
+    @staticmethod
+    def to_cartesian(x, y):
+        return x, y     # points are already in cartesian coords
+
+    def get_lines(self, viewport):
+        return self.marching_squares(viewport.cartesian_range, viewport)
+
+    def plot_settings(self):
+        return self.adaptive, self.max_depth, self.cells_per_pixel
+
+    def get_strip_lines(self, viewport, x_strip, y_strip):
+        cartesian_range = viewport.cartesian_range
+        width = cartesian_range["x"][1] - cartesian_range["x"][0]
+        height = cartesian_range["y"][1] - cartesian_range["y"][0]
+        lines = []
+        if x_strip is not None:     # contours only cover the screen so both strips need to be plotted
+            lines += self.marching_squares({"x": x_strip, "y": cartesian_range["y"]}, viewport,
+                                           ((x_strip[1] - x_strip[0]) / width, 1))
+        if y_strip is not None:
+            lines += self.marching_squares({"x": cartesian_range["x"], "y": y_strip}, viewport,
+                                           (1, (y_strip[1] - y_strip[0]) / height))
+        return lines
 
 
 class PolarExpression(Expression):
@@ -165,93 +186,143 @@ class PolarExpression(Expression):
     def __init__(self, p_function, p_vars):
         super(PolarExpression, self).__init__(p_function, p_vars)
 
-    def plot(self, canvas, frame_id, colour):
-        theta, r = self.get_points(polar_range["x"], 500)   # evaluates function in polar coords
-        x = r * np.cos(theta)  # converting from polar coords to cartesian coords
-        y = r * np.sin(theta)
-        self.plot_points(canvas, x, y, frame_id, colour)    # plotting the cartesian points
+    @staticmethod
+    def to_cartesian(theta, r):
+        return r * np.cos(theta), r * np.sin(theta)  # converting from polar coords to cartesian coords
 
+    def get_lines(self, viewport):
+        tolerance = self.pixel_tolerance / viewport.resolution
+        cartesian_range = viewport.cartesian_range
+        limit = np.hypot(max(np.abs(cartesian_range["x"])), max(np.abs(cartesian_range["y"])))  # distance from the
+        # origin to the furthest corner of the screen, r values past this are off screen
+        # evaluates function in polar coords and plots the cartesian points
+        curves = self.get_curves(viewport, viewport.polar_range["x"], 32, tolerance, limit)
+        return [(coords, {}) for coords in viewport.window_lines(curves)]
 
-class PolarMapping(Mapping):
+    def get_strip_lines(self, viewport, x_strip, y_strip):
+        return []   # the whole curve is plotted for every value of θ so nothing new comes onto the screen
 
-    def __init__(self, p_functions, p_vars):
-        super(PolarMapping, self).__init__(p_functions, p_vars)
 
-    def interpolate(self, evaluate, point1, point2):
-        new_polar_point = super(PolarMapping, self).interpolate(evaluate, point1, point2)  # interpolates between points
-        # in polar coordinates
-        if new_polar_point is None:  # checks if the new point is valid or not
-            return None
+class PolarMapping(Mapping):
 
-        new_theta = new_polar_point[0]
-        new_r = new_polar_point[1]
-        new_cartesian_point = (new_r * np.cos(new_theta), new_r * np.sin(new_theta))  # converts these polar coords into
-        # cartesian coords so they can be plotted
-        return new_cartesian_point
+    def __init__(self, p_function, p_vars):
+        super(PolarMapping, self).__init__(p_function, p_vars)
 
-    def plot(self, canvas, frame_id, colour):
-        self.marching_squares(polar_range, canvas, frame_id, colour)    # passing in polar range to get the mapping
+    @staticmethod
+    def to_cartesian(theta, r):
+        return r * np.cos(theta), r * np.sin(theta)  # converts the polar coords into cartesian coords so they can be
+        # plotted
+
+    def get_lines(self, viewport):
+        return self.marching_squares(viewport.polar_range, viewport)    # passing in polar range to get the mapping
         # points in polar coordinates first before they are converted into cartesian coords
 
+    def get_strip_lines(self, viewport, x_strip, y_strip):
+        return []   # the strips can't be turned into a polar range, so the graph is only updated once panning stops
+
 
 class VectorField:
-    def __init__(self, p_function):     # p_function will be [x_component, y_component]
+    arrow_spacing = 100     # minimum distance between arrows in pixels
+    streamline_spacing = 150    # minimum distance between the points streamlines start from in pixels
+    streamline_step = 4     # distance moved along a streamline each step in pixels
+    streamline_steps = 400  # maximum number of steps in each direction
+
+    def __init__(self, p_function, show_streamlines=False):     # p_function will be [x_component, y_component]
         self.func_x = p_function[0]     # functions for components
         self.func_y = p_function[1]
+        self.show_streamlines = show_streamlines    # condition to check if streamlines are drawn as well as the arrows
 
-    def plot(self, canvas, frame_id, colour):
-        # loops through all integer x and y values
-        for x in range(math.floor(cartesian_range["x"][0]), math.ceil(cartesian_range["x"][1]) + 1):
-            for y in range(math.floor(cartesian_range["y"][0]), math.ceil(cartesian_range["y"][1]) + 1):
-
-                try:
-                    # gets the x and y components for the output vector
-                    x_new, y_new = self.func_x(x, y), self.func_y(x, y)
-                    # gets the normalisation factor to keep the vectors displayed the same length
-                    normalisation_factor = 0.5 / (x_new ** 2 + y_new ** 2) ** 0.5
-                    # checks for invalid values
-                    if np.isnan(normalisation_factor) or np.isnan(x_new) or np.isnan(y_new) or np.isinf(x_new) \
-                            or np.isinf(y_new) or np.isinf(normalisation_factor):
-                        continue  # skips to the next point
-                except RuntimeError:  # if one of these errors are encountered the x/y vals are invalid and can't be
-                    # plotted
-                    continue  # skips to the next point
-                except ZeroDivisionError:
-                    continue
-                except RuntimeWarning:
-                    continue
-
-                start_pos = canvas.plane_to_win((x, y))  # gets the start position of the arrow in window coords
-                end_pos = [canvas.plane_to_win_x(x + x_new * normalisation_factor),  # gets the end position in window
-                           canvas.plane_to_win_y(y + y_new * normalisation_factor)]  # coords
-
-                canvas.create_line((start_pos, end_pos), tags=("plot", str(frame_id)), fill=colour, width=3,
-                                   arrow="last")  # draws the arrow for the vector
-
-        canvas.graphs.add(frame_id)  # adds vector field to the set of drawn expressions
-
-
-def create_expression(text):
-    # Parameters for string parsing
-    functions = {
-        "ln": "np.log", "abs": "np.abs",
-        "sin": "np.sin", "cos": "np.cos", "tan": "np.tan",
-        "csc": "1/np.sin", "sec": "1/np.cos", "cot": "1/np.tan",
-        "sqrt": "np.sqrt",
-        "sinh": "np.sinh", "cosh": "np.cosh", "tanh": "np.tanh",
-        "arcsin": "np.arcsin", "arccos": "np.arccos", "arctan": "np.arctan",
-        "arcsinh": "np.arcsinh", "arccosh": "np.arccosh", "arctanh": "np.arctanh"
-    }
-    variables = ["r", "θ", "x", "y"]
-    constants = {"e": "np.e", "π": "np.pi"}
-    numbers = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-    operators = ["+", "-", "=", "*", "/", "^"]
+    def plot_settings(self):
+        return self.show_streamlines,
+
+    @staticmethod
+    def get_spacing(viewport, pixels):
+        # converts a distance in pixels into plane units, rounded up to 1, 2 or 5 times a power of 10 so the arrows
+        # stay on the same points while panning and the number of arrows on the screen stays roughly the same when
+        # zooming
+        target = pixels / viewport.resolution
+        power = 10.0 ** math.floor(math.log10(target))
+        for multiple in [1, 2, 5, 10]:
+            if multiple * power >= target:
+                return multiple * power
+
+    def get_arrows(self, viewport, x_range, y_range):
+        spacing = self.get_spacing(viewport, self.arrow_spacing)
+        # points in the range that are multiples of the spacing
+        x = spacing * np.arange(math.ceil(x_range[0] / spacing), math.floor(x_range[1] / spacing) + 1)
+        y = spacing * np.arange(math.ceil(y_range[0] / spacing), math.floor(y_range[1] / spacing) + 1)
+        xv, yv = np.meshgrid(x, y)  # every combination of x and y is evaluated at once
+        with np.errstate(all="ignore"):
+            # gets the x and y components for the output vectors, constant components are given as a single value
+            x_new = np.broadcast_to(self.func_x(xv, yv), xv.shape).ravel()
+            y_new = np.broadcast_to(self.func_y(xv, yv), xv.shape).ravel()
+            # gets the normalisation factor to keep the vectors displayed half as long as the spacing
+            normalisation_factor = 0.5 * spacing / np.hypot(x_new, y_new)
+        xv, yv = xv.ravel(), yv.ravel()
+
+        # skips points where the vector is invalid or has no direction
+        valid = np.isfinite(x_new) & np.isfinite(y_new) & np.isfinite(normalisation_factor)
+        xv, yv, x_new, y_new, normalisation_factor = (array[valid] for array in
+                                                      (xv, yv, x_new, y_new, normalisation_factor))
+
+        # start and end positions of every arrow in window coordinates, converted all at once
+        coords = viewport.window_segments(xv, yv, xv + x_new * normalisation_factor,
+                                          yv + y_new * normalisation_factor)
+        return [(arrow, {"arrow": "last"}) for arrow in coords]
+
+    def get_streamlines(self, viewport):
+        spacing = self.get_spacing(viewport, self.streamline_spacing)
+        x_range, y_range = viewport.cartesian_range["x"], viewport.cartesian_range["y"]
+        # a streamline starts from every multiple of the spacing on the screen, offset by half the spacing so they
+        # don't start on top of the arrows
+        x = spacing * (np.arange(math.floor(x_range[0] / spacing), math.ceil(x_range[1] / spacing)) + 0.5)
+        y = spacing * (np.arange(math.floor(y_range[0] / spacing), math.ceil(y_range[1] / spacing)) + 0.5)
+        xv, yv = np.meshgrid(x, y)
+        step = self.streamline_step / viewport.resolution
+        lines = streamlines(self.func_x, self.func_y, xv.ravel(), yv.ravel(), step, self.streamline_steps, x_range,
+                            y_range)  # all the streamlines are calculated at once
+        return [(coords, {"width": 1}) for coords in viewport.window_lines(lines)]
+
+    def get_lines(self, viewport):
+        lines = self.get_arrows(viewport, viewport.cartesian_range["x"], viewport.cartesian_range["y"])
+        if self.show_streamlines:
+            lines += self.get_streamlines(viewport)
+        return lines
+
+    def get_strip_lines(self, viewport, x_strip, y_strip):
+        # streamlines go across the whole screen so they are only redrawn once panning stops
+        arrows = []
+        if x_strip is not None:
+            arrows += self.get_arrows(viewport, x_strip, viewport.cartesian_range["y"])
+        if y_strip is not None:
+            arrows += self.get_arrows(viewport, viewport.cartesian_range["x"], y_strip)
+        return arrows
+
+
+def normalise_text(text):
+    return text.replace(" ", "")    # spaces are ignored by the tokeniser so they don't change the expression
+
+
+def create_expression(text, previous=None, history=None):
+    # previous is the expression the text was edited from, it is reused if the edit didn't change its structure,
+    # history is the ParseHistory of the expression frame so only the edited part of the text is parsed again
+    key = (GRAMMAR_VERSION, normalise_text(text))
+    cached = expression_cache.get(key, MISSING)
+    if cached is not MISSING:   # the same text has already been parsed so its expression object is reused
+        return cached
 
     # converts string to dictionary with information used to create an expression object
-    expression_token = expression_to_function(text, functions, variables, constants, numbers, operators)
+    previous_function = previous.function if previous else None
+    expression_token = expression_to_function(text, FUNCTIONS, ["r", "θ", "x", "y"], CONSTANTS, NUMBERS,
+                                              ["+", "-", "=", "*", "/", "^"], previous_function, history)
     if expression_token is False:   # checks for valid expression
+        expression_cache.put(key, False)    # invalid text is cached too
         return False
 
+    if expression_token["function"] is previous_function:   # nothing needs to be recreated
+        expression_cache.put(key, previous)
+        return previous
+
     generate_expression = {  # lookup table for expression class    generate_expression["coords"]["class"]
         "cartesian": {"mapping": Mapping, "function": Expression},
         "polar": {"mapping": PolarMapping, "function": PolarExpression}
@@ -261,37 +332,42 @@ def create_expression(text):
     # creates the expression object
     new_expression = new_expression_class(expression_token["function"], expression_token["variables"])
 
+    expression_cache.put(key, new_expression)
     return new_expression
 
 
-def create_vector(x, y):
-    functions = {
-        "ln": "np.log", "abs": "np.abs",
-        "sin": "np.sin", "cos": "np.cos", "tan": "np.tan",
-        "csc": "1/np.sin", "sec": "1/np.cos", "cot": "1/np.tan",
-        "sqrt": "np.sqrt",
-        "sinh": "np.sinh", "cosh": "np.cosh", "tanh": "np.tanh",
-        "arcsin": "np.arcsin", "arccos": "np.arccos", "arctan": "np.arctan",
-        "arcsinh": "np.arcsinh", "arccosh": "np.arccosh", "arctanh": "np.arctanh"
-    }
-    variables = ["x", "y"]  # vector fields only use x, y
-    constants = {"e": "np.e", "π": "np.pi"}
-    numbers = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-    operators = ["+", "-", "*", "/", "^"]  # no = is required due to all vector fields being explicit
+def create_vector_component(text, previous_function=None, history=None):
+    key = (GRAMMAR_VERSION, "vector", normalise_text(text))     # components are cached separately so changing one
+    cached = expression_cache.get(key, MISSING)     # of them doesn't reparse the other
+    if cached is not MISSING:
+        return cached
+
+    # vector fields only use x, y and no = is required due to all vector fields being explicit
+    func = vector_expression_to_function(text, FUNCTIONS, ["x", "y"], CONSTANTS, NUMBERS, ["+", "-", "*", "/", "^"],
+                                         previous_function, history)
+    expression_cache.put(key, func)
+    return func
 
-    # creates the components of the vectors
-    func_x, func_y = vector_expression_to_function(x, functions, variables, constants, numbers, operators), \
-                     vector_expression_to_function(y, functions, variables, constants, numbers, operators)
+
+def create_vector(x, y, previous=None, show_streamlines=False, histories=(None, None)):
+    # creates the components of the vectors, histories are the ParseHistory of each component's textbox
+    func_x = create_vector_component(x, previous.func_x if previous else None, histories[0])
+    func_y = create_vector_component(y, previous.func_y if previous else None, histories[1])
 
     # checks if vector components are valid or not
     if not func_x or not func_y:
         return False
 
-    vector_expression = VectorField([func_x, func_y])  # creates vector field object
+    if (previous and func_x is previous.func_x and func_y is previous.func_y and
+            show_streamlines == previous.show_streamlines):     # neither the components nor the settings have changed
+        return previous
+
+    vector_expression = VectorField([func_x, func_y], show_streamlines)  # creates vector field object
 
     return vector_expression
 
 
 if __name__ == "__main__":
-    get_range([[-1, 4], [1, -4]])
+    from viewport import Viewport
+    viewport = Viewport(100, -1, 4, 200, 800)   # x from -1 to 1 and y from -4 to 4
     expression = Expression(lambda x: np.sin(x), {"x"})
@@ -0,0 +1,288 @@
+from list_conversion_algorithms import tokenise, retokenise
+
+
+class Node:
+    # base class for the nodes of an expression tree, two trees are equal when they have the same structure
+    fields = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.fields, values):
+            setattr(self, field, value)
+        self.hash = hash((type(self).__name__,) + values)    # nodes aren't changed once they are made, so the hash
+        # is only calculated once instead of going through the whole subtree every time
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.hash == other.hash and self.values() == other.values()
+
+    def __hash__(self):
+        return self.hash
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(value) for value in self.values())})"
+
+
+class Number(Node):
+    fields = ("value",)
+
+
+class Variable(Node):
+    fields = ("name",)
+
+
+class Constant(Node):
+    fields = ("name",)
+
+
+class Negate(Node):
+    fields = ("operand",)
+
+
+class BinaryOperation(Node):
+    fields = ("operator", "left", "right")     # operator is one of + - * / ^
+
+
+class FunctionCall(Node):
+    fields = ("name", "argument")
+
+
+class Equation(Node):
+    fields = ("left", "right")
+
+
+class ParseError(Exception):
+    def __init__(self, message, position):
+        super(ParseError, self).__init__(message)
+        self.position = position    # index of the character in the typed string where the error was found
+
+
+class ParseHistory:
+    # the tokens and bracketed subtrees of the last text an expression frame was parsed from, so after an edit only
+    # the characters around the change are tokenised again and only the brackets the change is inside are parsed again
+    def __init__(self):
+        self.grammar = None     # tokens can only be reused with the same functions, variables etc.
+        self.text = ""
+        self.tokens = []    # [(token, start, end)...] from the tokeniser
+        self.parsed = []    # the parser's tokens [(token, kind, start)...] including the end marker
+        self.groups = {}    # {index of an open bracket token: (index of its closed bracket, subtree, variables)...}
+
+
+class Parser:
+    # recursive descent parser using the same precedence as python once the mathematical conventions have been
+    # replaced: + - < * / (and implied multiplication) < unary - < ^ (right associative)
+    def __init__(self, expression_string, functions, variables, constants, numbers, operators, history=None):
+        self.kinds = [("function", functions), ("variable", variables), ("constant", constants), ("number", numbers),
+                      ("operator", operators), ("decimal_point", ["."]), ("open_bracket", ["("]),
+                      ("closed_bracket", [")"])]
+        grammar = tuple(tuple(elements) for kind, elements in self.kinds)
+        if history is not None and history.grammar == grammar:     # only the tokens the edit changed are new
+            tokens, first, last, resume = retokenise(history.text, history.tokens, expression_string, functions,
+                                                     constants)
+            shift = len(expression_string) - len(history.text)
+            self.tokens = (history.parsed[:first] + [self.token_kind(*token) for token in tokens[first:last]] +
+                           [(token, kind, start + shift) for token, kind, start in history.parsed[resume:-1]])
+
+            # brackets that are all before or all after the edit are parsed the same way as before
+            moved = last - resume   # how far the tokens after the edit have moved in the list
+            self.groups = {}
+            for start, (end, node, group_variables) in history.groups.items():
+                if end < first:
+                    self.groups[start] = (end, node, group_variables)
+                elif start >= resume:
+                    self.groups[start + moved] = (end + moved, node, group_variables)
+        else:
+            tokens = tokenise(expression_string, functions, constants)
+            self.tokens = [self.token_kind(*token) for token in tokens]   # [(token, kind, start)...]
+            self.groups = {}    # brackets that have already been parsed
+        self.tokens.append(("", "end", len(expression_string)))     # marks the end of the expression
+
+        if history is not None:     # kept for the next edit, even if this text turns out to be invalid
+            history.grammar, history.text, history.tokens = grammar, expression_string, tokens
+            history.parsed, history.groups = self.tokens, self.groups
+
+        self.position = 0   # index of the next token
+        self.previous = None    # kind of the last token that was used
+        self.variables = set()  # variables used in the expression
+
+    def token_kind(self, token, start, end):
+        for kind, elements in self.kinds:
+            if token in elements:
+                return token, kind, start
+        return token, "illegal", start  # raises an error when the parser gets to it
+
+    def peek(self):
+        return self.tokens[self.position]
+
+    def advance(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        self.previous = token[1]
+        return token
+
+    def expect(self, token):
+        if self.peek()[0] != token:
+            raise ParseError(f"expected {token}", self.peek()[2])
+        return self.advance()
+
+    def implied_multiplication(self):
+        # multiplication signs can be left out between e.g. 2x, xy, x(y), (x)sin(x)
+        kind = self.peek()[1]
+        if kind in ["variable", "constant", "function", "open_bracket"]:
+            return self.previous in ["variable", "constant", "number", "closed_bracket"]
+        if kind == "number":
+            return self.previous in ["variable", "constant", "closed_bracket"]
+        return False
+
+    def parse(self):
+        tree = self.expression()
+        if self.peek()[:2] == ("=", "operator"):
+            self.advance()
+            tree = Equation(tree, self.expression())
+        if self.peek()[1] != "end":     # e.g. a second = or an unmatched closed bracket
+            raise ParseError(f"unexpected {self.peek()[0]}", self.peek()[2])
+        return tree
+
+    def expression(self):
+        node = self.term()
+        while self.peek()[0] in ["+", "-"]:
+            operator = self.advance()[0]
+            node = BinaryOperation(operator, node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while True:
+            if self.peek()[0] in ["*", "/"]:
+                operator = self.advance()[0]
+                node = BinaryOperation(operator, node, self.factor())
+            elif self.implied_multiplication():
+                node = BinaryOperation("*", node, self.factor())
+            else:
+                return node
+
+    def factor(self):
+        if self.peek()[0] == "-":   # negative sign
+            self.advance()
+            return Negate(self.factor())
+        return self.power()
+
+    def power(self):
+        base = self.primary()
+        if self.peek()[0] == "^":
+            self.advance()
+            return BinaryOperation("^", base, self.factor())   # the exponent can be negative e.g. x^-2
+        return base
+
+    def primary(self):
+        token, kind, start = self.peek()
+        if kind in ["number", "decimal_point"]:
+            return self.number()
+        if kind == "variable":
+            self.advance()
+            self.variables.add(token)
+            return Variable(token)
+        if kind == "constant":
+            self.advance()
+            return Constant(token)
+        if kind == "open_bracket":
+            return self.bracketed()
+        if kind == "function":
+            return self.function_call()
+        if kind == "illegal":
+            raise ParseError(f"illegal character {token}", start)
+        raise ParseError("expected a number, variable or bracket", start)
+
+    def bracketed(self):
+        # (expression), brackets the last edit didn't change are skipped over and given the subtree they had before
+        start = self.position
+        if start in self.groups:
+            end, node, variables = self.groups[start]
+            self.position = end + 1
+            self.previous = "closed_bracket"
+        else:
+            outside, self.variables = self.variables, set()     # the variables inside are kept with the subtree
+            self.advance()
+            node = self.expression()
+            self.expect(")")
+            variables, self.variables = self.variables, outside
+            self.groups[start] = (self.position - 1, node, variables)
+        self.variables |= variables
+        return node
+
+    def number(self):
+        start = self.peek()[2]
+        text = ""
+        while self.peek()[1] == "number":
+            text += self.advance()[0]
+        if self.peek()[1] == "decimal_point":
+            text += self.advance()[0]
+            while self.peek()[1] == "number":
+                text += self.advance()[0]
+        if text == ".":     # a decimal point needs at least one digit
+            raise ParseError("expected a digit", start)
+        return Number(float(text) if "." in text else int(text))
+
+    def function_call(self):
+        name = self.advance()[0]
+        if self.peek()[0] == "(":   # sin(x)
+            return FunctionCall(name, self.bracketed())
+
+        # brackets can be left out when the argument is one digit, variable, constant or function e.g. sinx, sin2x
+        # which is sin(2)x, or sincosx
+        token, kind, start = self.peek()
+        if kind == "number":
+            self.advance()
+            if self.peek()[1] in ["number", "decimal_point"]:
+                raise ParseError("brackets are needed around numbers with more than one digit", start)
+            return FunctionCall(name, Number(int(token)))
+        if kind in ["variable", "constant", "function"]:
+            return FunctionCall(name, self.primary())
+        raise ParseError(f"expected an argument for {name}", start)
+
+
+def classify(tree, variables):
+    # gets the type of the expression and the variables it is a function of, raises an error if the variables can't
+    # be plotted together
+    if isinstance(tree, Equation):  # mappings can use 1 variable or x and y/r and θ together
+        if variables <= {"x", "y"} and variables:
+            return {"coords": "cartesian", "class": "mapping"}, ["x", "y"]
+        if variables <= {"r", "θ"} and variables:
+            return {"coords": "polar", "class": "mapping"}, ["θ", "r"]
+    elif not variables or variables == {"x"}:  # explicit functions need to be a function of x/θ, or a constant
+        return {"coords": "cartesian", "class": "function"}, variables
+    elif variables == {"θ"}:
+        return {"coords": "polar", "class": "function"}, variables
+    raise ParseError("invalid combination of variables", 0)
+
+
+def parse_expression(expression_string, functions, variables, constants, numbers, operators, history=None):
+    # returns {"tree": expression tree, "type": {"coords": ..., "class": ...}, "variables": ...} or False if the
+    # expression is invalid, history is the ParseHistory of the text this was edited from
+    try:
+        parser = Parser(expression_string, functions, variables, constants, numbers, operators, history)
+        tree = parser.parse()
+        express_type, express_vars = classify(tree, parser.variables)
+    except ParseError:
+        return False
+    return {"tree": tree, "type": express_type, "variables": express_vars}
+
+
+def parse_vector_component(expression_string, functions, variables, constants, numbers, operators, history=None):
+    # vector components are always functions of x and y, returns the expression tree or False if it is invalid
+    try:
+        tree = Parser(expression_string, functions, variables, constants, numbers, operators, history).parse()
+    except ParseError:
+        return False
+    if isinstance(tree, Equation):
+        return False
+    return tree
+
+
+if __name__ == "__main__":
+    pfunctions = {"sin": 0, "tan": 0, "cos": 0, "tanh": 0, "arcsin": 0}
+    pconstants = {"π": 0, "e": 0}
+    pnumbers = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+    print(parse_expression("2sinx^2 + tanh(x)", pfunctions, ["r", "θ", "x", "y"], pconstants, pnumbers,
+                           ["+", "-", "=", "*", "/", "^"]))
@@ -2,6 +2,7 @@ import customtkinter as ctk
 from datetime import date
 from uuid import uuid4
 from graphing_window import GraphingWindow, ExpressionFrame, VectorExpressionFrame
+from execution_algorithms import Mapping
 from keypad import Keypad
 from custom_widgets import Toolbar, FullScreenMenu, MenuBtn, DynamicScrollFrame
 import database_functions
@@ -89,10 +90,17 @@ class GraphingScreen(ctk.CTkFrame):
 
         self.toolbar = GraphingToolbar(self, 0.03, self.title)  # toolbar places itself onto the screen
 
+    def load_expressions(self, expressions):    # expressions = [(expression_id, expression_text)...]
+        # adds the expression frames of a saved graph, nothing is plotted until all of them have been made, then the
+        # grid is drawn and every expression is compiled and plotted in one redraw once the screen has been laid out
+        with self.graphing_window.suspend_redraws("load"):
+            self.sidebar.expression_section.base_frame.add_all(expressions)
+
 
 class GraphingToolbar(Toolbar):
     def __init__(self, parent, rel_height, title):
         super(GraphingToolbar, self).__init__(parent, rel_height, title)
+        self.contours_btn = None
         self.graphing_toolbar_init()
 
     def graphing_toolbar_init(self):
@@ -100,10 +108,30 @@ class GraphingToolbar(Toolbar):
         file_btn = MenuBtn(self, "file", save_menu)  # links the file button to the save menu
         file_btn.place(anchor="ne", relx=1, rely=0, relheight=1)  # and adds it to the toolbar
 
+        if self.master.type == "2d":    # mappings are only plotted on 2d graphs
+            self.contours_btn = ctk.CTkButton(self, text=self.contours_text(), command=self.toggle_contours)
+            self.contours_btn.place(anchor="ne", relx=0.89, rely=0, relheight=1)
+
+    @staticmethod
+    def contours_text():
+        return "contours: adaptive" if Mapping.adaptive else "contours: grid"
+
+    def toggle_contours(self):
+        # switches every mapping between the fixed grid and the quadtree, which follows thin or small contours more
+        # closely
+        Mapping.adaptive = not Mapping.adaptive
+        self.contours_btn.configure(text=self.contours_text())
+        GraphingWindow.graphing_window.request_redraw("settings")   # replots every graph
+
     def go_back(self):
         super(GraphingToolbar, self).go_back()  # goes to the previous screen
+        graphing_window = GraphingWindow.graphing_window
+        graphing_window.evaluation_service.shutdown()    # stops any graphs being calculated
+        if graphing_window.redraw_job is not None:  # a scheduled redraw would run on the window after it has gone
+            graphing_window.after_cancel(graphing_window.redraw_job)
+            graphing_window.redraw_job = None
+        graphing_window.redraw_deadlines = {}
         GraphingWindow.graphing_window = None   # resets any global variables for graphing window and expression frame
-        GraphingWindow.graphs = set()
         screen = self.master
         for frame_class in screen.expression_frame_dict.values():   # goes through all types of expression frames
             frame_class.expression_frames = {}                      # and resets their variables
@@ -1,6 +1,14 @@
 import customtkinter as ctk
-from execution_algorithms import get_range, create_expression, create_vector
+from execution_algorithms import create_expression, create_vector, draw_lines, lines_key, calculate_lines, \
+    geometry_cache
+from evaluation_service import EvaluationService
+from expression_parser import ParseHistory
+from scene_layer import SceneLayer
+from viewport import Viewport
+from contextlib import contextmanager
+import numpy as np
 import math
+import time
 from uuid import uuid4
 DEF_HEIGHT = int(1080/2)
 DEF_WIDTH = int(1920/2)
@@ -28,141 +36,191 @@ class Window(ctk.CTk):
 
 class GraphingWindow(ctk.CTkCanvas):
     graphing_window = None
-    graphs = set()
 
     def __init__(self, parent, expression_frames):
         super(GraphingWindow, self).__init__(master=parent, bg="white")
-        self.win_width = DEF_WIDTH   # width and height references for drawing the grid
-        self.win_height = DEF_HEIGHT    # are set to default initially but get changed immediately to match the
-        # screen dimensions due to the configure event
+        # default resolution of 192 pixels per grid unit with (-5, 5) at the top left, the width and height are set to
+        # default initially but get changed immediately to match the screen dimensions due to the configure event
+        self.viewport = Viewport.from_point(192, [0, 0], [-5, 5], DEF_WIDTH, DEF_HEIGHT)
 
         self.start_x = None     # position of mouse cursor at start of drag click
         self.start_y = None
 
+        # redraw scheduler, events mark the screen or single expressions as dirty and one redraw is done for all of them
+        self.redraw_delays = {"text": 0, "zoom": 0, "release": 0, "settings": 0, "resize": 50, "load": 50,
+                              "drag": 150}  # ms to wait for more events from each source before redrawing, 0 redraws
+        # as soon as the current events have been handled
+        self.redraw_deadlines = {}  # time each source with a pending event wants the redraw to happen
+        self.redraw_job = None  # id of the scheduled redraw
+        self.redraws_suspended = False  # events only mark what needs redrawing while this is True
+        self.viewport_dirty = False     # condition to check if the whole plane needs to be redrawn
+        self.dirty_frames = set()   # ids of expression frames whose text has changed
+        self.evaluation_service = EvaluationService(self)   # calculates the graphs in the background
+
+        # canvas items are kept between redraws and moved to their new positions instead of being recreated
+        self.grid_lines = SceneLayer(self, "line", ("grid_lines", "grid_line"))
+        self.axes_numbers = SceneLayer(self, "text", ("axes_numbers", "grid_line"))
+        self.plot_layers = {}   # expression frame id: layer with the lines of its graph
+
         self.expression_frames = expression_frames  # reference to the expression frame class
 
         self.bind("<Configure>", self.re_size)  # binding events
         self.bind("<B1-Motion>", self.shift_move)
         self.bind("<Button-1>", self.shift_start)
+        self.bind("<ButtonRelease-1>", self.shift_end)
 
-        self.resolution = 192   # default resolution (pixels per grid unit)
-        self.displacement = self.get_displacement([0, 0], [-5, 5])  # default displacement
         GraphingWindow.graphing_window = self  # assigns the graphing window to a class variable, so it can be accessed
         # by the other parts of the program
 
-    def get_displacement(self, window_point, plane_point):
-        displacement = [plane_point[0] - 1/self.resolution * window_point[0], plane_point[1] + 1/self.resolution *
-                        window_point[1]]    # uses a point that you know the window and plane version of and
-        return displacement     # calculates a displacement vector
-
-    def win_to_plane(self, window_point):
-        plane_point = [self.displacement[0] + window_point[0]/self.resolution, self.displacement[1] -
-                       window_point[1]/self.resolution]  # converts a window point into a plane point
-        return plane_point
-
-    def plane_to_win(self, plane_point):
-        window_point = [self.resolution * (plane_point[0] - self.displacement[0]), self.resolution *
-                        (self.displacement[1] - plane_point[1])]  # converts a plane point into a window point
-        return window_point
-
-    def plane_to_win_x(self, plane_x):
-        return self.resolution * (plane_x - self.displacement[0])   # returns the x window coordinate of an x plane
-        # coordinate
+    def re_size(self, event):   # updates the width and height of the viewport for drawing the grid
+        self.viewport = self.viewport.resized(event.width, event.height)
+        self.request_redraw("resize")    # redraws grid once the window stops changing size
 
-    def plane_to_win_y(self, plane_y):
-        return self.resolution * (self.displacement[1] - plane_y)   # returns the y window coordinate of a y plane
-    # coordinate
-
-    def re_size(self, event):   # updates the width and height attributes of the plane for drawing the grid
-        self.win_width = event.width    # resets height and width attributes
-        self.win_height = event.height
-        self.grid_init()    # redraws grid
+    def request_redraw(self, source, frame_id=None):
+        if frame_id is None:    # events without an expression frame change the whole plane
+            self.viewport_dirty = True
+        else:
+            self.dirty_frames.add(frame_id)
+        if self.redraws_suspended:  # suspend_redraws schedules the redraw once it is finished
+            return
+
+        # each new event from a source pushes back the time it wants the redraw to happen
+        self.redraw_deadlines[source] = time.monotonic() + self.redraw_delays[source] / 1000
+
+        if self.redraw_job is not None:     # only one redraw is ever scheduled
+            self.after_cancel(self.redraw_job)
+        delay = round((min(self.redraw_deadlines.values()) - time.monotonic()) * 1000)  # the most urgent source
+        if delay <= 0:  # decides when the redraw happens
+            self.redraw_job = self.after_idle(self.redraw)
+        else:
+            self.redraw_job = self.after(delay, self.redraw)
+
+    @contextmanager
+    def suspend_redraws(self, source):
+        # events inside the with block e.g. adding lots of expression frames only mark what needs to be redrawn, it
+        # is then all redrawn together as if there had been one event from source
+        self.redraws_suspended = True
+        try:
+            yield
+        finally:
+            self.redraws_suspended = False
+            self.request_redraw(source)
+
+    def redraw(self):
+        self.redraw_job = None  # resets the scheduler
+        self.redraw_deadlines = {}
+
+        frames = self.expression_frames.expression_frames
+        dirty_frames = [frames[i] for i in self.dirty_frames if i in frames]  # skips frames that have been destroyed
+        self.dirty_frames = set()
+        for frame in dirty_frames:  # creates the new expression objects for any changed text
+            frame.update_expression()
+
+        if self.viewport_dirty:
+            self.viewport_dirty = False
+            self.grid_init(exclude={frame.id for frame in dirty_frames})  # redraws the plane and all other graphs
+
+        for frame in dirty_frames:
+            frame.validated_plot()  # plots the changed graphs if they are valid
 
     def shift_start(self, event):   # sets initial position of cursor at the start of a drag-click
         self.start_x = event.x
         self.start_y = event.y
 
     def shift_move(self, event):    # moves the plane when the user performs a drag-click
-        dx = (event.x - self.start_x) / self.resolution  # gets change in x and change in y in plane coordinates
-        dy = (event.y - self.start_y) / self.resolution
+        dx = event.x - self.start_x  # gets change in x and change in y in window coordinates
+        dy = event.y - self.start_y
 
-        self.displacement = [self.displacement[0] - dx, self.displacement[1] + dy]  # adds the change in the
-        # displacement vector, since window coordinates have a flipped orientation dy needs to be added
-        self.grid_init()    # redraws the grid
+        self.viewport = self.viewport.moved(dx, dy)     # moves the viewport by the change in the displacement vector
+        self.move("plot", dx, dy)   # moves the graphs that are already drawn instead of replotting them
+        self.draw_grid()    # redraws the grid
+        self.plot_strips(dx, dy)    # plots the parts of the graphs that have just come onto the screen
+        self.request_redraw("drag")     # the graphs are fully replotted once the user stops dragging
 
         self.start_x = event.x  # resets the initial cursor position
         self.start_y = event.y
 
-    def grid_init(self):
-        self.delete("grid_line")     # gets rid of any grid lines
-        self.delete("plot")          # gets rid of all plotted graphs
-        GraphingWindow.graphs = set()   # resets set of graphs on the plane
-
-        top_left = self.win_to_plane([0, 0])    # gets the top left and bottom right corners in plane coords to get the
-        bottom_right = self.win_to_plane([self.win_width, self.win_height])  # range for x/y
-
-        x_start = top_left[0]
-        y_start = bottom_right[1]
-
-        x_end = bottom_right[0]
-        y_end = top_left[1]
-
-        # goes through visible integer x/y values in plane coords
-        for i in range(math.ceil(x_start), math.floor(x_end) + 1):
-            start = self.plane_to_win([i, 0])   # gets x coordinate in pixels for vertical lines
-            self.create_line([start[0], 0], [start[0], self.win_height], tags="grid_line")  # tags needed to delete
-                                                                                            # grid lines
-        for j in range(math.ceil(y_start), math.floor(y_end) + 1):
-            start = self.plane_to_win([0, j])   # gets y coordinate in pixels for horizontal lines
-            self.create_line([0, start[1]], [self.win_width, start[1]], tags="grid_line")
-
-        origin = self.plane_to_win([0, 0])      # converts origin to window coordinates
-        self.create_line([origin[0], 0], [origin[0], self.win_height], tags="grid_line", width=3)
-        self.create_line([0, origin[1]], [self.win_width, origin[1]], tags="grid_line", width=3)
-
-        self.add_axes_numbers(x_start, x_end, y_start, y_end)   # labelling axes
-
-        get_range([top_left, bottom_right])  # gets the range for the Expression classes
-
-        self.expression_frames.plot_all()   # plots all expressions
+    def shift_end(self, event):     # replots straight away when the user lets go after dragging
+        if "drag" in self.redraw_deadlines:
+            self.request_redraw("release")
+
+    def plot_strips(self, dx, dy):
+        viewport = self.viewport
+        x_range, y_range = viewport.cartesian_range["x"], viewport.cartesian_range["y"]
+
+        x_strip = None  # range of x/y values that have just come onto the screen
+        y_strip = None
+        if dx > 0:  # plane moved right so there is a new strip on the left
+            x_strip = [x_range[0], x_range[0] + dx / viewport.resolution]
+        elif dx < 0:
+            x_strip = [x_range[1] + dx / viewport.resolution, x_range[1]]
+        if dy > 0:  # plane moved down so there is a new strip at the top
+            y_strip = [y_range[1] - dy / viewport.resolution, y_range[1]]
+        elif dy < 0:
+            y_strip = [y_range[0], y_range[0] - dy / viewport.resolution]
+
+        if x_strip is not None or y_strip is not None:
+            self.expression_frames.plot_strips(viewport, x_strip, y_strip)
+
+    def grid_init(self, exclude=()):
+        # graphs already on the plane are left until their replacements have been calculated, so they don't flicker
+        self.draw_grid()
+        self.expression_frames.plot_all(exclude)   # plots all expressions except the excluded frame ids
+
+    def plot_layer(self, frame_id):
+        if frame_id not in self.plot_layers:    # the expression hasn't been drawn before
+            self.plot_layers[frame_id] = SceneLayer(self, "line", (str(frame_id), "plot"))
+        return self.plot_layers[frame_id]
+
+    def draw_grid(self):
+        self.evaluation_service.invalidate()    # graphs being calculated for the old viewport are out of date
+
+        viewport = self.viewport
+        x_range, y_range = viewport.cartesian_range["x"], viewport.cartesian_range["y"]
+
+        # visible integer x/y values in plane coords, converted to window coordinates all at once
+        x_values = np.arange(math.ceil(x_range[0]), math.floor(x_range[1]) + 1)
+        y_values = np.arange(math.ceil(y_range[0]), math.floor(y_range[1]) + 1)
+        win_x = viewport.to_window_x(x_values).tolist()     # x coordinates in pixels for vertical lines
+        win_y = viewport.to_window_y(y_values).tolist()     # y coordinates in pixels for horizontal lines
+        origin = [viewport.to_window_x(0), viewport.to_window_y(0)]     # converts origin to window coordinates
+
+        lines = [([x, 0, x, viewport.height], {"width": 1}) for x in win_x]     # [(coords, options)...] of every
+        lines += [([0, y, viewport.width, y], {"width": 1}) for y in win_y]     # line in the grid
+        lines.append(([origin[0], 0, origin[0], viewport.height], {"width": 3}))
+        lines.append(([0, origin[1], viewport.width, origin[1]], {"width": 3}))
+        self.grid_lines.update(lines)   # moves the lines already on the canvas to their new positions
+
+        self.add_axes_numbers(x_values.tolist(), win_x, y_values.tolist(), win_y, origin)   # labelling axes
+
+        self.tag_lower("grid_line")     # keeps the grid underneath any graphs
 
     def zoom_in(self):
-
-        center_window = [self.win_width / 2, self.win_height / 2]   # center will not change so they can be used
-        center_plane = self.win_to_plane(center_window)             # to calculate the displacement vector
-
-        self.resolution += 20   # increasing pixels per unit
-        self.displacement = self.get_displacement(center_window, center_plane)  # recalculating displacement
-
-        self.grid_init()    # redrawing the grid
+        self.viewport = self.viewport.zoomed(self.viewport.resolution + 20)    # increasing pixels per unit, the
+        # center of the screen doesn't change
+        self.request_redraw("zoom")    # redrawing the grid
 
     def zoom_out(self):
-        if self.resolution-20 > 0:  # resolution cannot be 0
-            center_window = [self.win_width / 2, self.win_height / 2]   # same as zoom_in
-            center_plane = self.win_to_plane(center_window)
-
-            self.resolution -= 20   # decreasing pixels per unit
-            self.displacement = self.get_displacement(center_window, center_plane)  # recalculates displacement since
-            # the center is invariant
-
-            self.grid_init()    # redrawing the grid
+        if self.viewport.resolution-20 > 0:  # resolution cannot be 0
+            self.viewport = self.viewport.zoomed(self.viewport.resolution - 20)    # decreasing pixels per unit
+            self.request_redraw("zoom")    # redrawing the grid
 
-    def add_axes_numbers(self, x_start, x_end, y_start, y_end):
+    def add_axes_numbers(self, x_values, win_x, y_values, win_y, origin):
+        # x/y_values are the integers on the axes and win_x/y are their window coordinates
+        numbers = []    # [(coords, options)...] of every number on the axes
 
-        if 0 <= self.plane_to_win_y(0) <= self.win_height:  # checks if the x-axis is on the screen
-            for i in range(math.ceil(x_start), math.floor(x_end) + 1):  # goes through integer x values
-                pos = self.plane_to_win([i, 0])  # converts the plane coordinates of the position of the number
-                # to window coordinates
-                self.create_text(pos[0]-5, pos[1]+5, text=f"{i}", anchor="ne", tags="grid_line")
+        if 0 <= origin[1] <= self.viewport.height:  # checks if the x-axis is on the screen
+            for i, x in zip(x_values, win_x):  # goes through integer x values
+                numbers.append(([x-5, origin[1]+5], {"text": f"{i}", "anchor": "ne"}))
                 # add number to pos with an offset to keep the numbers from touching the axes
 
-        if 0 <= self.plane_to_win_x(0) <= self.win_width:   # checks if the y-axis is on the screen
-            for j in range(math.ceil(y_start), math.floor(y_end) + 1):  # goes through integer y values
-                pos = self.plane_to_win([0, j])  # converts the plane coordinates of the position of the number
-                # to window coordinates
-                self.create_text(pos[0]-5, pos[1]+5, text=f"{j}", anchor="ne", tags="grid_line")
+        if 0 <= origin[0] <= self.viewport.width:   # checks if the y-axis is on the screen
+            for j, y in zip(y_values, win_y):  # goes through integer y values
+                numbers.append(([origin[0]-5, y+5], {"text": f"{j}", "anchor": "ne"}))
                 # add number to pos with an offset to keep the numbers from touching the axes
 
+        self.axes_numbers.update(numbers)
+
 
 class ExpressionFrame(ctk.CTkFrame):
     expression_frames = {}  # lookup table for all expression frames
@@ -185,6 +243,7 @@ class ExpressionFrame(ctk.CTkFrame):
         self.text_variable = ctk.StringVar()    # string variable for text widget
         self.text_variable.set(text)    # sets the value of the string variable
         self.expression = None
+        self.parse_history = ParseHistory()     # the last text that was parsed, so edits to it are parsed quicker
 
         self.bind("<Button-1>", self.set_current)   # binds event to set the current frame
         self.expression_frame_init()
@@ -218,16 +277,18 @@ class ExpressionFrame(ctk.CTkFrame):
         self.textbox.bind("<Button-1>", self.set_current)
 
     def on_text_change(self, *args):
-        self.expression = create_expression(self.textbox.get())    # creates the correct expression object based
-        # on entered text
-        self.validated_plot()   # plots the graph if valid
+        GraphingWindow.graphing_window.request_redraw("text", self.id)  # the expression is recreated and plotted
+        # by the graphing window's next redraw, so a burst of changes only gets plotted once
 
-    def validated_plot(self):
-        if self.id in GraphingWindow.graphs:    # checks if graph is on the canvas
-            GraphingWindow.graphs.remove(self.id)   # removes it from set of graphs on the canvas
-            GraphingWindow.graphing_window.delete(str(self.id))     # removes it from the plane
+    def update_expression(self):
+        self.expression = create_expression(self.textbox.get(), self.expression, self.parse_history)   # creates the
+        # correct expression object based on entered text, the previous expression is reused if the edit didn't change
+        # it
 
+    def validated_plot(self):
         if self.expression is False:    # checks if the expression is valid
+            GraphingWindow.graphing_window.evaluation_service.cancel(self.id)
+            self.remove_graph()     # an invalid expression's old graph is removed straight away
             self.error()    # frame goes into error state if not valid
         else:
             self.indicator_label.configure(bg_color="white")  # plots graph on screen if expression is valid
@@ -235,19 +296,52 @@ class ExpressionFrame(ctk.CTkFrame):
             self.plot_expression()
 
     def plot_expression(self):
-        try:    # draws the graph of the expression onto the screen
-            self.expression.plot(GraphingWindow.graphing_window, self.id, self.colour)
-        except TypeError:   # catches any invalid expressions that my own validation can't
-            self.error()
-        except SyntaxError:
-            self.error()
+        canvas = GraphingWindow.graphing_window
+        expression = self.expression    # the job keeps using this expression and viewport even if the text changes
+        viewport = canvas.viewport  # or the plane is moved
+        lines = geometry_cache.get(lines_key(expression, viewport))
+        if lines is not None:   # the graph has already been calculated for this viewport so it is drawn straight away
+            canvas.evaluation_service.cancel(self.id)
+            draw_lines(canvas, lines, self.id, self.colour)
+        else:   # the graph is calculated on a worker thread and drawn by draw_result once it is ready
+            canvas.evaluation_service.submit(self.id, lambda: calculate_lines(expression, viewport),
+                                             self.draw_result)
+
+    def draw_result(self, future):
+        if GraphingWindow.graphing_window is None or self.status != "visible":  # the graph was hidden or the screen
+            return  # was closed while it was being calculated
+        try:    # draws the graph of the expression onto the screen, replacing the old graph
+            lines = future.result()
+        except Exception:   # catches any invalid expressions that my own validation can't, whatever the worker
+            self.error()    # thread raised, and hides the old graph so it isn't left on the screen
+            self.remove_graph()
+        else:
+            draw_lines(GraphingWindow.graphing_window, lines, self.id, self.colour)
+
+    def remove_graph(self):
+        layer = GraphingWindow.graphing_window.plot_layers.get(self.id)
+        if layer is not None:   # checks if graph is on the canvas
+            layer.hide()    # its lines are kept so they can be reused when it is plotted again
 
     @classmethod
-    def plot_all(cls):
+    def plot_all(cls, exclude=()):
         for expression_frame in cls.expression_frames.values():  # goes through all expression frames
-            if expression_frame.status == "visible":    # checks for all expression frames have visible graphs
+            # checks for all expression frames have visible graphs
+            if expression_frame.status == "visible" and expression_frame.id not in exclude:
                 expression_frame.plot_expression()
 
+    @classmethod
+    def plot_strips(cls, viewport, x_strip, y_strip):
+        for expression_frame in cls.expression_frames.values():  # plots the new strips of all visible graphs
+            if expression_frame.status == "visible":
+                try:    # strips are small so they are drawn straight away while the user is dragging
+                    lines = expression_frame.expression.get_strip_lines(viewport, x_strip, y_strip)
+                    draw_lines(GraphingWindow.graphing_window, lines, expression_frame.id, expression_frame.colour,
+                               add=True)   # the strips are added onto the graph that is already drawn
+                except Exception:
+                    expression_frame.error()
+                    expression_frame.remove_graph()
+
     def error(self):
         self.status = "error"   # sets the expression frame's state to error
         self.indicator_label.configure(bg_color="red")  # changes the indicator label to red to show user that the
@@ -255,9 +349,10 @@ class ExpressionFrame(ctk.CTkFrame):
 
     def destroy_frame(self):
         self.__class__.expression_frames.pop(self.id)   # gets rid of the frame from the lookup table
-        if self.id in GraphingWindow.graphs:  # checks if the frame's expression is on the plane
-            GraphingWindow.graphs.remove(self.id)   # removes the expression from set of drawn graphs
-            GraphingWindow.graphing_window.delete(str(self.id))   # removes the graph from the plane
+        GraphingWindow.graphing_window.evaluation_service.cancel(self.id)   # stops any plot that is being calculated
+        layer = GraphingWindow.graphing_window.plot_layers.pop(self.id, None)
+        if layer is not None:
+            layer.clear()   # removes the graph from the plane
 
         if self.id == self.__class__.current:   # checks if this frame is the current one
             self.__class__.current = None   # if it is then there are no selected graphs
@@ -269,10 +364,11 @@ class ExpressionFrame(ctk.CTkFrame):
     def hide_graph(self):
         if self.status == "visible":    # checks if graph is visible
             self.status = "hidden"  # sets the graph to hidden
-            GraphingWindow.graphing_window.delete(str(self.id))  # deletes the graph from the graphing plane
+            GraphingWindow.graphing_window.evaluation_service.cancel(self.id)
+            self.remove_graph()     # hides the graph on the graphing plane
         elif self.status == "hidden":   # if graph is hidden
-            self.on_text_change()       # the entered expression is validated then
-            # the graph gets plotted and its status gets changed to visible
+            self.status = "visible"     # the expression hasn't changed so it doesn't need to be validated again, its
+            self.plot_expression()      # graph is shown once it has been replotted for the current viewport
 
     def get_colour(self):
         colours = ["red", "blue", "purple", "green"]    # colours to cycle through
@@ -297,6 +393,10 @@ class VectorExpressionFrame(ExpressionFrame):
         # text widgets
         self.textbox_x = None   # current textbox being used will be self.textbox- this is the value accessed by
         self.textbox_y = None   # the keypad
+        self.streamlines_button = None
+
+        self.show_streamlines = False   # condition to check if streamlines are drawn as well as the arrows
+        self.parse_history_y = ParseHistory()   # the x component uses the frame's parse_history
 
         super(VectorExpressionFrame, self).__init__(parent, p_id, text)
 
@@ -316,15 +416,24 @@ class VectorExpressionFrame(ExpressionFrame):
 
         self.textbox = self.textbox_x
 
+        self.streamlines_button = ctk.CTkButton(self, text="streamlines: off", command=self.toggle_streamlines)
+        self.streamlines_button.place(anchor="sw", relx=0.175, rely=0.9)    # button to show/hide streamlines
+        self.streamlines_button.bind("<Button-1>", self.set_current)
+
+    def toggle_streamlines(self):
+        self.show_streamlines = not self.show_streamlines
+        self.streamlines_button.configure(text="streamlines: on" if self.show_streamlines else "streamlines: off")
+        self.on_text_change()   # the vector field is recreated with the new setting and replotted
+
     def set_current_textbox(self, event, textbox):
         self.__class__.current = self.id  # makes this frame the current one
         self.textbox = textbox  # makes the selected textbox the current one
 
-    def on_text_change(self, *args):
+    def update_expression(self):
         x = self.textbox_x.get()    # gets inputted x and y components
         y = self.textbox_y.get()
-        self.expression = create_vector(x, y)   # creates vector object
-        self.validated_plot()   # validates and plots the vector field
+        self.expression = create_vector(x, y, self.expression, self.show_streamlines,
+                                        (self.parse_history, self.parse_history_y))   # creates vector object
 
     def get_expression(self):
         return self.textbox_x.get() + "|" + self.textbox_y.get()  # combines x/y components for saving the expression
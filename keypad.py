@@ -88,7 +88,7 @@ class TextBtn(ctk.CTkButton):
         if frames.current is not None:      # checks if an expression frame is selected
             frame = frames.expression_frames[frames.current]    # if yes then the buttons value is
             frame.textbox.insert(ctk.INSERT, self.value)    # inserted into the frame's selected text widget
-            frame.on_text_change()  # plots the graph if the new expression text is valid
+            # the text variable's trace calls on_text_change to plot the graph if the new text is valid
 
 
 class HideKeypadBtn(MenuBtn):
@@ -1,38 +1,84 @@
-from copy import copy
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 
 
-def string_to_list(strng):
-    output = []     # creates an empty list and adds the
-    for i in strng:  # elements of the string to the
-        output.append(i)    # empty list one by one
-    return output
+@lru_cache(maxsize=16)
+def key_pattern(key_elements):
+    # regex that matches the longest key element at the current position or a single character if there isn't one,
+    # built once for each set of key elements
+    alternatives = [re.escape(element) for element in sorted(key_elements, key=len, reverse=True)]
+    return re.compile("|".join(alternatives + ["."]), re.DOTALL)
 
 
-def tokenisation(expression_string, key_elements):
-    if len(key_elements) == 0:  # checks if the stack is empty, the string has no key elements
-        return string_to_list(expression_string)    # returns string converted to a list
+def tokenise(expression_string, functions, constants):
+    # splits the string into tokens in one pass, returns [(token, start, end)...] where start/end are the token's
+    # position in the original string
+    positions = [i for i, character in enumerate(expression_string) if character != " "]  # spaces are ignored, but
+    string_no_spaces = "".join(expression_string[i] for i in positions)  # the positions of the other characters are
+    # kept so the spans refer to the string that was typed in
 
-    element = key_elements.pop()    # gets element at the top of the stack
-    split_string = expression_string.split(sep=element)  # removes the element from the list and returns an
-    # list containing the two substrings on either side of the element
+    pattern = key_pattern(tuple(constants) + tuple(functions))
+    return [(match.group(), positions[match.start()], positions[match.end() - 1] + 1)
+            for match in pattern.finditer(string_no_spaces)]
 
-    if len(split_string) == 1:  # if the list has one element then the element was not in the string
-        return tokenisation(split_string[0], key_elements)  # repeats process with other key elements
 
-    expression_list = []
-    for i in range(len(split_string)-1):    # goes through all substrings adding the element between them
-        expression_list += tokenisation(split_string[i], copy(key_elements)) + [element]  # adds converted substrings to list
-    expression_list += tokenisation(split_string[-1], copy(key_elements))  # goes through last substring
-    return expression_list
+def common_prefix_length(a, b):
+    # binary search over slices so the characters are compared by python's string comparison instead of one by one
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
 
-def expression_format(expression_string, functions, constants):
-    string_no_spaces = expression_string.replace(" ", "")  # gets rid of any spaces
+def retokenise(old_string, old_tokens, new_string, functions, constants):
+    # tokenises new_string, an edit of old_string which tokenised to old_tokens, only the tokens around the edited
+    # characters are found again, returns (tokens, first, last, resume) where tokens[first:last] are new, the tokens
+    # before them are old_tokens[:first] and the ones after them are old_tokens[resume:] moved along by the edit
+    longest = max(map(len, chain(functions, constants)), default=1)   # how many characters a match can look at
+    prefix = common_prefix_length(old_string, new_string)
+    suffix = common_prefix_length(old_string[prefix:][::-1], new_string[prefix:][::-1])
+    shift = len(new_string) - len(old_string)
+
+    # a token is matched the same way again if the tokens from it up to the edit cover as many characters as the
+    # longest key element, since a token is at least one character that many tokens is always enough
+    first = max(0, bisect_right(old_tokens, prefix, key=itemgetter(2)) - longest + 1)
+    restart = old_tokens[first - 1][2] if first else 0
+    after = bisect_left(old_tokens, len(old_string) - suffix, key=itemgetter(1))    # old tokens after the edit
+
+    # once a new token starts where an old token after the edit did, the rest of the string is split up the same way
+    # as before, the new tokens are found up to 2 * longest old tokens past the edit so every one of them before the
+    # one that lines up had enough characters after it to be matched fully
+    window = after + 2 * longest
+    if window < len(old_tokens):
+        stop = old_tokens[window][1] + shift
+        starts = {old_tokens[i][1] + shift: i for i in range(after, window - longest + 1)}
+        middle = tokenise(new_string[restart:stop], functions, constants)
+        for last, (token, start, end) in enumerate(middle):
+            resume = starts.get(start + restart)
+            if resume is not None:
+                tokens = (old_tokens[:first] +
+                          [(token, start + restart, end + restart) for token, start, end in middle[:last]] +
+                          [(token, start + shift, end + shift) for token, start, end in old_tokens[resume:]])
+                return tokens, first, first + last, resume
 
-    # We need to sort key elements by length since we need to check for longer elements first
-    key_elements = sorted(list(constants) + list(functions), key=len)
-    return tokenisation(string_no_spaces, key_elements)
+    # the edit is near the end of the string or changed how the tokens after it are split up
+    middle = tokenise(new_string[restart:], functions, constants)
+    tokens = old_tokens[:first] + [(token, start + restart, end + restart) for token, start, end in middle]
+    return tokens, first, len(tokens), len(old_tokens)
+
+
+def expression_format(expression_string, functions, constants):
+    # longer key elements are matched first so e.g. "tanh" is never split into "tan" and "h"
+    return [token for token, start, end in tokenise(expression_string, functions, constants)]
 
 
 if __name__ == "__main__":
     print(expression_format("tanhsincosx", {"sin": 0, "tan": 0, "cos": 0, "tanh": 0, "arcsin": 0}, {"pi": 0, "e": 0}))
+    print(tokenise("2 sin x", {"sin": 0}, {"e": 0}))
@@ -1,6 +1,7 @@
 import customtkinter as ctk
-from custom_widgets import Toolbar, DynamicScrollFrame, FullScreenMenu, MenuBtn
+from custom_widgets import Toolbar, VirtualScrollFrame, FullScreenMenu, MenuBtn
 from graphing_screen import GraphingScreen
+from search_controller import SearchController
 import database_functions
 
 DEF_HEIGHT = int(1080*0.7)
@@ -28,6 +29,7 @@ class LoadGraphScreen(ctk.CTkFrame):
         self.searchbar = None   # widgets
         self.result_section = None
         self.toolbar = None
+        self.delete_menu = None     # one delete menu is shared by all results
         self.mode = ctk.StringVar(value="all")      # sets the default value for the
         self.sort_by = ctk.StringVar(value="name")  # option menus
 
@@ -37,6 +39,7 @@ class LoadGraphScreen(ctk.CTkFrame):
 
     def load_graph_screen_init(self):   # creates and adds widgets
         self.toolbar = Toolbar(self, 0.03, "Load Graph")    # creates and places toolbar
+        self.delete_menu = DeleteMenu(self)   # delete menu to ask for confirmation if the user wants to delete a graph
 
         self.searchbar = Searchbar(self)  # creates and places searchbar
         self.searchbar.place(anchor="sw", relx=0.025, rely=0.15, relwidth=0.675, relheight=0.05)
@@ -44,8 +47,8 @@ class LoadGraphScreen(ctk.CTkFrame):
         # creates option menus
         mode_menu = ctk.CTkOptionMenu(self, values=["all", "2d", "vector"], variable=self.mode,
                                       command=self.searchbar.search)
-        sort_by_menu = ctk.CTkOptionMenu(self, values=["name", "date created", "date modified"], variable=self.sort_by,
-                                         command=self.searchbar.search)
+        sort_by_menu = ctk.CTkOptionMenu(self, values=["name", "date created", "date modified", "relevance"],
+                                         variable=self.sort_by, command=self.searchbar.search)
 
         # creates labels for option menus
         mode_label = ctk.CTkLabel(self, text="Mode:")
@@ -58,8 +61,9 @@ class LoadGraphScreen(ctk.CTkFrame):
         sort_by_label.place(anchor="sw", relx=0.85, rely=0.15, relwidth=0.04, relheight=0.05)
         sort_by_menu.place(anchor="sw", relx=0.89, rely=0.145)
 
-        result_section_wrapper = ctk.CTkFrame(self)     # adds results section to the screen
-        self.result_section = DynamicScrollFrame(result_section_wrapper, Result, 3, 5, 257)
+        result_section_wrapper = ctk.CTkFrame(self)     # adds results section to the screen, only the results on
+        # screen have frames which are reused as the section is scrolled
+        self.result_section = VirtualScrollFrame(result_section_wrapper, Result, 3, 5, 206, (self,))
         result_section_wrapper.place(relx=0, rely=0.205, relwidth=1, relheight=0.795)
 
     def pack(self, **kwargs):
@@ -70,41 +74,47 @@ class LoadGraphScreen(ctk.CTkFrame):
 class Searchbar(ctk.CTkEntry):
     def __init__(self, parent):
         super(Searchbar, self).__init__(master=parent)
-        self.bind("<KeyRelease>", self.search)
+        self.controller = SearchController(self, self.show_results)     # runs searches in the background
+        self.bind("<KeyRelease>", self.search_later)
 
-    def search(self, event=None):
+    def search_later(self, event=None):
+        self.search(wait=True)  # waits until the user stops typing so there isn't a search for every key
+
+    def search(self, event=None, wait=False):
         search_item = self.get()    # gets entered string
-        screen = self.master    # navigates to screen and result section base frame
-        results = screen.result_section.base_frame
-        results.remove_all()    # resets the result section
+        screen = self.master    # navigates to screen
 
         mode = screen.mode.get()    # gets extra search criteria
         sort_by = screen.sort_by.get()
         # maps the option menu text to the correct field name to sort by
-        sort_dict = {"name": "name", "date created": "date_created", "date modified": "date_modified"}
+        sort_dict = {"name": "name", "date created": "date_created", "date modified": "date_modified",
+                     "relevance": "rank"}
         sort_by = sort_dict[sort_by]
 
-        graphs = database_functions.get_graphs(search_item, sort_by, mode)  # gets all graphs with the search item
-        # as a substring according to search criteria
-        for graph in graphs:    # goes through all results and adds them to the result section
-            graph_id, graph_title, g_type, date_created, date_modified = graph[0], graph[1], graph[2], graph[3],\
-                                                                         graph[4]
-            results.add((screen, graph_id, graph_title, g_type, date_created, date_modified))
+        # finds all graphs whose name or expressions match the search item according to search criteria
+        self.controller.search((search_item, sort_by, mode), wait)
+
+    def show_results(self, numbers):
+        # called once the search has finished, the graphs are read from the database as the result section needs them
+        result_section = self.master.result_section
+        result_section.set_source(database_functions.read_graphs(numbers, result_section.page_size))
 
 
 class Result(ctk.CTkFrame):
     selected_graph_id = None    # global variable for delete menu to access the selected graph
 
-    def __init__(self, parent, p_screen, p_graph_id, p_graph_title, p_type, p_date_created, p_date_modified):
+    def __init__(self, parent, p_screen):
         super(Result, self).__init__(master=parent)
-        self.graph_id = p_graph_id  # data about graph that needs to be displayed on the frame
-        self.graph_title = p_graph_title
-        self.type = p_type
-        self.date_created = p_date_created
-        self.date_modified = p_date_modified
+        self.graph_id = None  # data about graph that needs to be displayed on the frame, set by set_item
+        self.graph_title = None
+        self.type = None
+        self.date_created = None
+        self.date_modified = None
 
-        self.delete_menu = DeleteMenu(p_screen)   # delete menu to ask for confirmation if the user wants to delete
-        # the graph
+        self.go_to_graph_btn = None     # widgets that show the data
+        self.type_label = None
+        self.date_created_label = None
+        self.date_modified_label = None
 
         self.screen = p_screen  # needed to call the pack_forget method for the screen in the load graph method
         self.result_init()
@@ -114,20 +124,29 @@ class Result(ctk.CTkFrame):
         wrapper.rowconfigure(0, weight=1)   # sets up columns and rows of this frame
         wrapper.columnconfigure((0, 1, 2, 3, 4), weight=1)
 
-        go_to_graph_btn = ctk.CTkButton(wrapper, text=self.graph_title, command=self.load_graph)   # creates widgets
-        type_label = ctk.CTkLabel(wrapper, text="Mode: " + self.type)                              # to show data/
-        date_created_label = ctk.CTkLabel(wrapper, text="Date Created: " + self.date_created)      # interact with graph
-        date_modified_label = ctk.CTkLabel(wrapper, text="Date Modified: " + self.date_modified)
-        delete_btn = DeleteBtn(wrapper, "delete", self.delete_menu)
-
-        go_to_graph_btn.grid(row=0, column=0, sticky="nsew", padx=2, pady=5)    # adds widgets to the wrapper using grid
-        type_label.grid(row=0, column=1, sticky="nsew", padx=2, pady=5)
-        date_created_label.grid(row=0, column=2, sticky="nsew", padx=2, pady=5)
-        date_modified_label.grid(row=0, column=3, sticky="nsew", padx=2, pady=5)
+        self.go_to_graph_btn = ctk.CTkButton(wrapper, command=self.load_graph)  # creates widgets to show data/
+        self.type_label = ctk.CTkLabel(wrapper)                                 # interact with graph
+        self.date_created_label = ctk.CTkLabel(wrapper)
+        self.date_modified_label = ctk.CTkLabel(wrapper)
+        delete_btn = DeleteBtn(wrapper, "delete", self.screen.delete_menu)
+
+        # adds widgets to the wrapper using grid
+        self.go_to_graph_btn.grid(row=0, column=0, sticky="nsew", padx=2, pady=5)
+        self.type_label.grid(row=0, column=1, sticky="nsew", padx=2, pady=5)
+        self.date_created_label.grid(row=0, column=2, sticky="nsew", padx=2, pady=5)
+        self.date_modified_label.grid(row=0, column=3, sticky="nsew", padx=2, pady=5)
         delete_btn.grid(row=0, column=4, sticky="nsew", padx=2, pady=5)
 
         wrapper.place(relx=0, rely=0, relheight=1, relwidth=1)  # places the wrapper onto the result frame
 
+    def set_item(self, graph):
+        # shows a different graph on the frame when the result section is scrolled or searched
+        self.graph_id, self.graph_title, self.type, self.date_created, self.date_modified = graph
+        self.go_to_graph_btn.configure(text=self.graph_title)
+        self.type_label.configure(text="Mode: " + self.type)
+        self.date_created_label.configure(text="Date Created: " + self.date_created)
+        self.date_modified_label.configure(text="Date Modified: " + self.date_modified)
+
     def load_graph(self):
         window = self.screen.master  # navigates to window
         graphing_screen = GraphingScreen(window,    # creates graphing screen passing in existing data fields
@@ -139,12 +158,9 @@ class Result(ctk.CTkFrame):
         graphing_screen.previous = self.screen  # sets previous pointer for graphing screen
         self.screen.pack_forget()   # removes the current screen
         graphing_screen.pack(fill="both", expand=True)  # packs new graphing screen onto the window
-        graphing_screen.graphing_window.grid_init()  # draws grid onto the plane
-        # loop through all expressions and add them to the expression container
-        expressions = database_functions.get_expressions(self.graph_id)  # gets expressions of the saved graph
-        for expression in expressions:  # iterates through expressions and adds them to the graphing window
-            expression_id, expression_text = expression[0], expression[1]
-            graphing_screen.sidebar.expression_section.base_frame.add((expression_id, expression_text))
+        # adds all expressions of the saved graph to the expression container, the grid and the graphs are drawn
+        # together afterwards
+        graphing_screen.load_expressions(database_functions.get_expressions(self.graph_id))
 
 
 class DeleteBtn(MenuBtn):
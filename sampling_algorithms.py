@@ -0,0 +1,116 @@
+import numpy as np  # numpy is needed for array processing
+
+SPLIT = 0.4781  # intervals are split slightly off centre so a curve that is symmetric about the centre of an interval
+# (like sin(50x) around 0) can't look like a straight line
+
+
+def find_breaks(x, y, inputs, values, pixel, limit=None):
+    # x/y are the samples in cartesian coords, inputs/values are what the function was given and gave back, pixel is
+    # the size of a pixel in plane units and limit is the size of a value that is off the screen, returns an array
+    # with one value per interval between samples that is True where the curve needs to be split
+    with np.errstate(all="ignore"):
+        finite = np.isfinite(x) & np.isfinite(y)
+        gaps = ~(finite[:-1] & finite[1:])  # the function is undefined at one end of the interval
+
+        # a step is a discontinuity when it is much bigger than the curve's slope on either side of it says it should
+        # be, adaptive sampling keeps halving the interval a jump is in so it is no wider than the intervals next to
+        # it, and a jump smaller than a few pixels can't be seen
+        step = np.hypot(np.diff(x), np.diff(y))
+        width = np.diff(inputs)
+        rate = np.where(gaps, np.nan, step / width)    # how fast the curve moves across each interval
+        padded = np.concatenate([[np.nan] * 2, rate, [np.nan] * 2])
+        fastest = np.nanmax(np.stack([padded[:-4], padded[1:-3], padded[3:-1], padded[4:], np.zeros(len(rate))]),
+                            axis=0)   # the fastest the curve moves in the 2 intervals on either side
+        padded = np.concatenate([[np.inf], width, [np.inf]])
+        narrow = width <= 1.1 * np.minimum(padded[:-2], padded[2:])  # intervals are split slightly off centre
+        jumps = (step > 4 * fastest * width) & (step > 4 * pixel) & narrow
+
+        # the function goes through infinity, which means the magnitude grows faster and faster towards the interval
+        # from both sides instead of levelling off like it does at a smooth peak, and goes off the screen
+        growth = np.diff(np.abs(values)) / width    # how fast the magnitude grows to the right across each interval
+        growing = np.ones(len(gaps), dtype=bool)
+        growing[1:] &= growth[:-1] > 0
+        growing[2:] &= growth[1:-1] > growth[:-2]
+        growing[:-1] &= growth[1:] < 0
+        growing[:-2] &= growth[1:-1] < growth[2:]
+        if limit is None:
+            poles = np.zeros(len(gaps), dtype=bool)
+        else:
+            off_screen = np.abs(values) > limit
+            poles = growing & ((off_screen[:-1] & off_screen[1:]) |
+                               ((values[:-1] * values[1:] < 0) & (off_screen[:-1] | off_screen[1:])))
+
+    return gaps | jumps | poles
+
+
+def split_curve(x, y, breaks):
+    # splits the samples into separate curves wherever there is a break, returns a list of (x, y) pairs of arrays
+    curves = []
+    for curve_x, curve_y in zip(np.split(x, np.nonzero(breaks)[0] + 1), np.split(y, np.nonzero(breaks)[0] + 1)):
+        mask = np.isfinite(curve_x) & np.isfinite(curve_y)  # gets rid of invalid points left at the ends
+        if np.count_nonzero(mask) > 1:  # at least 2 points are needed to draw a line
+            curves.append((curve_x[mask], curve_y[mask]))
+    return curves
+
+
+def adaptive_sample(function, start, end, num_samples, tolerance, transform, limit=None, max_depth=12,
+                    max_samples=5000):
+    # starts with a coarse pass of evenly spaced samples and then keeps splitting the intervals where the curve is
+    # not straight enough to be drawn as a line, transform converts the samples into cartesian coords
+    # limit is the size of a value that is definitely off the screen, it is used to stop refining around poles
+    x = np.linspace(start, end, num_samples)
+    with np.errstate(all="ignore"):     # invalid values are dealt with once the curve has been sampled
+        y = function(x)
+    x_samples, y_samples = [x], [y]
+
+    left, right = x[:-1], x[1:]     # intervals that still need to be checked
+    y_left, y_right = y[:-1], y[1:]
+    total = num_samples
+
+    for depth in range(max_depth):
+        if len(left) == 0:  # every interval is already accurate enough
+            break
+
+        mid = left + SPLIT * (right - left)
+        with np.errstate(all="ignore"):     # every interval in this level is evaluated at once
+            y_mid = function(mid)
+
+            # distance between the curve at the split point and the straight line that would be drawn instead
+            x_l, y_l = transform(left, y_left)
+            x_r, y_r = transform(right, y_right)
+            x_m, y_m = transform(mid, y_mid)
+            error = np.hypot(x_m - (x_l + SPLIT * (x_r - x_l)), y_m - (y_l + SPLIT * (y_r - y_l)))
+
+        defined = np.isfinite(y_left) | np.isfinite(y_mid) | np.isfinite(y_right)  # skips where the function is
+        refine = ~(error <= tolerance) & defined    # undefined, an invalid error means an edge of the domain is
+        # inside the interval so it gets refined too
+
+        if limit is not None:   # intervals that are completely off the screen don't need to be refined
+            with np.errstate(all="ignore"):
+                off_screen = np.minimum(np.abs(y_left), np.abs(y_right)) > limit
+                same_side = ((y_left > 0) == (y_right > 0)) & ((y_mid > 0) == (y_left > 0)) & (np.abs(y_mid) > limit)
+                pole = (y_left * y_right < 0) & (np.abs(y_mid) > np.maximum(np.abs(y_left), np.abs(y_right)))
+            refine &= ~(off_screen & (same_side | pole))
+
+        if total + np.count_nonzero(refine) > max_samples:  # stops once the sample budget is used up
+            break
+
+        mid, y_mid = mid[refine], y_mid[refine]     # only the midpoints of refined intervals are kept
+        x_samples.append(mid)
+        y_samples.append(y_mid)
+        total += len(mid)
+
+        left, right = np.concatenate([left[refine], mid]), np.concatenate([mid, right[refine]])   # splits the refined
+        y_left, y_right = np.concatenate([y_left[refine], y_mid]), np.concatenate([y_mid, y_right[refine]])  # intervals
+
+    x = np.concatenate(x_samples)
+    y = np.concatenate(y_samples)
+    order = np.argsort(x, kind="stable")    # puts the samples back in order
+    return x[order], y[order]
+
+
+if __name__ == "__main__":
+    sample_x, sample_y = adaptive_sample(np.tan, -5, 5, 64, 0.5 / 192, lambda a, b: (a, b), 3)
+    line_x, line_y = adaptive_sample(lambda a: 2 * a + 1, -5, 5, 64, 0.5 / 192, lambda a, b: (a, b), 3)
+    tan_breaks = find_breaks(sample_x, sample_y, sample_x, sample_y, 1 / 192, 3)
+    print(len(sample_x), len(line_x), len(split_curve(sample_x, sample_y, tan_breaks)))
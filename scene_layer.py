@@ -0,0 +1,48 @@
+class SceneLayer:
+    # a group of canvas items that is kept between redraws, new shapes are put into the existing items with coords
+    # and items are only created or deleted when the number of shapes changes
+    # every shape of a layer should be given the same option names, so a reused item doesn't keep an option from the
+    # shape it showed before
+
+    def __init__(self, canvas, kind, tags):
+        self.canvas = canvas
+        self.create = getattr(canvas, "create_" + kind)     # e.g. create_line or create_text
+        self.tags = tags    # the first tag is only used by this layer
+        self.items = []     # canvas item ids
+        self.options = []   # options each item was last given
+        self.visible = True
+
+    def update(self, shapes):
+        # shapes = [(coords, options)...] replaces everything the layer was showing
+        for i, (coords, options) in enumerate(shapes[:len(self.items)]):    # reuses the items that already exist
+            self.canvas.coords(self.items[i], coords)
+            if options != self.options[i]:
+                self.canvas.itemconfigure(self.items[i], **options)
+                self.options[i] = options
+        if len(shapes) < len(self.items):   # gets rid of items that aren't needed any more
+            self.canvas.delete(*self.items[len(shapes):])
+            del self.items[len(shapes):], self.options[len(shapes):]
+        self.add(shapes[len(self.items):])
+
+    def add(self, shapes):
+        # adds shapes on top of the ones the layer is already showing
+        state = "normal" if self.visible else "hidden"
+        for coords, options in shapes:
+            self.items.append(self.create(coords, tags=self.tags, state=state, **options))
+            self.options.append(options)
+
+    def show(self):
+        if not self.visible:
+            self.visible = True
+            self.canvas.itemconfigure(self.tags[0], state="normal")
+
+    def hide(self):
+        if self.visible:
+            self.visible = False
+            self.canvas.itemconfigure(self.tags[0], state="hidden")
+
+    def clear(self):
+        if self.items:
+            self.canvas.delete(self.tags[0])
+        self.items = []
+        self.options = []
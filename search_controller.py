@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import database_functions
+from caching import LRUCache, MISSING
+
+# graph_numbers of the graphs a search found in order, and (name, expressions) of each of them if there are few
+# enough graphs for them to be narrowed down by a longer search item, otherwise None
+SearchResults = namedtuple("SearchResults", ["numbers", "texts"])
+
+
+class SearchController:
+    # runs the load screen's searches on a worker thread so typing never waits for the database, a search only starts
+    # once the user has stopped typing and results are cached until a graph is saved or deleted
+    delay = 150     # ms without typing before a search starts
+    poll_delay = 10     # ms between checks for a finished search
+    narrow_limit = 2000     # most graphs results can have and still be narrowed down without a query, filtering
+    # in python is slower than the query for more graphs than this and it can't be interrupted
+
+    def __init__(self, widget, callback, cache_size=16):
+        self.widget = widget    # widget used to schedule searches and polling on the tkinter thread
+        self.callback = callback    # called with the graph_numbers of the graphs found by the newest search
+        self.executor = ThreadPoolExecutor(max_workers=1)   # one worker so it can keep its own connection, sqlite
+        self.connection = None  # connections can't be used by more than one thread
+        # (search item, sort_by, mode): search results, the size is an estimate of the bytes used
+        self.cache = LRUCache(max_entries=cache_size, max_size=8 * 1024 ** 2)
+        self.data_version = database_functions.data_version     # version of the database the cache is for
+        self.shown = None   # (key, data version) of the graphs that were last passed to the callback
+        self.search_job = None  # id of the scheduled search
+        self.future = None  # newest search that has been submitted to the worker
+        self.poll_job = None    # id of the scheduled poll
+        database_functions.get_connection()     # the database is migrated on this thread before the worker uses it
+
+    def search(self, key, wait=False):
+        # key is (search item, sort_by, mode), if wait is True the search starts after the delay unless another
+        # search replaces it first
+        if self.search_job is not None:
+            self.widget.after_cancel(self.search_job)
+            self.search_job = None
+        if wait:
+            self.search_job = self.widget.after(self.delay, self.run, key)
+        else:
+            self.run(key)
+
+    def run(self, key):
+        self.search_job = None
+        self.cancel()   # the previous search is out of date
+
+        if self.data_version != database_functions.data_version:    # graphs have been saved or deleted
+            self.cache.clear()
+            self.data_version = database_functions.data_version
+
+        results = self.cache.get(key, MISSING)
+        if results is not MISSING:
+            self.show(key, results)
+            return
+
+        superset = self.find_superset(key)
+        if superset is not None:    # the results can be found from the cached results without a query
+            future = self.executor.submit(self.narrow, key[0], superset)
+        else:
+            future = self.executor.submit(self.query, key)
+        future.key = key
+        future.data_version = self.data_version
+        self.future = future
+
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(self.poll_delay, self.poll)
+
+    def find_superset(self, key):
+        # gets cached results for a search item that the new search item extends, e.g. sin for sinh, every graph the
+        # new search finds is in them, results that are too big to be narrowed down or that graph_matches can't check
+        # exactly aren't used
+        search_item, sort_by, mode = key
+        if sort_by == "rank":   # filtering the results would keep the ranking of the shorter search item
+            return None
+        for length in range(len(search_item) - 1, -1, -1):
+            shorter = search_item[:length]
+            # switching between FTS5 and LIKE can find graphs the shorter search item didn't, unless it found
+            # every graph
+            if shorter.strip() and database_functions.uses_index(shorter) != database_functions.uses_index(search_item):
+                continue
+            results = self.cache.get((shorter, sort_by, mode), MISSING)
+            if results is not MISSING:  # results for shorter search items have at least as many graphs
+                if results.texts is None or not database_functions.can_narrow(search_item, results.texts):
+                    return None
+                return results
+        return None
+
+    @staticmethod
+    def narrow(search_item, superset):
+        # runs on the worker thread
+        matches = [i for i, (name, expressions) in enumerate(superset.texts) if
+                   database_functions.graph_matches(search_item, name, expressions)]
+        return SearchResults([superset.numbers[i] for i in matches], [superset.texts[i] for i in matches])
+
+    def query(self, key):
+        # runs on the worker thread, only the graph_numbers are read so the graphs can be paged in as the result list
+        # is scrolled, the names and expressions are only read if the results are small enough to be narrowed down
+        if self.connection is None:
+            self.connection = database_functions.open_connection()
+        numbers = [row[0] for row in database_functions.find_graphs(*key, conn=self.connection, numbers=True)]
+        texts = None
+        if len(numbers) <= self.narrow_limit:
+            texts = database_functions.graph_texts(numbers, self.connection)
+        return SearchResults(numbers, texts)
+
+    def cancel(self):
+        if self.future is not None:
+            if not self.future.cancel() and self.connection is not None:    # the search has already started
+                self.connection.interrupt()     # stops the query, the worker's result is dropped
+            self.future = None
+
+    def poll(self):
+        self.poll_job = None
+        future = self.future
+        if future is None:  # the search was cancelled
+            return
+        if not future.done():
+            self.poll_job = self.widget.after(self.poll_delay, self.poll)
+            return
+
+        self.future = None
+        results = future.result()
+        if future.data_version == database_functions.data_version:     # graphs haven't been saved or deleted during
+            size = len(results.numbers) * 40    # the search, a number in a list takes up about 40 bytes
+            if results.texts is not None:
+                size += sum(len(name) + len(expressions or "") + 120 for name, expressions in results.texts)
+            self.cache.put(future.key, results, size)
+        self.show(future.key, results)
+
+    def show(self, key, results):
+        # the results aren't shown again if nothing has changed e.g. when the cursor is moved in the searchbar
+        if self.shown != (key, self.data_version):
+            self.shown = (key, self.data_version)
+            self.callback(results.numbers)
@@ -0,0 +1,81 @@
+import numpy as np  # numpy is needed for array processing
+
+
+def field_direction(func_x, func_y, x, y):
+    # unit vectors in the direction of the field, invalid where the field is undefined or has no direction
+    with np.errstate(all="ignore"):
+        u = np.broadcast_to(func_x(x, y), x.shape)
+        v = np.broadcast_to(func_y(x, y), x.shape)
+        size = np.hypot(u, v)
+        return u / size, v / size
+
+
+def integrate_streamlines(func_x, func_y, seed_x, seed_y, step, num_steps, x_range, y_range):
+    # moves every particle along the field at once using RK4, a negative step follows the field backwards
+    # returns (points, particles) x and y arrays where each particle's path ends at the first NaN, and an array that
+    # is True for the particles that got back to where they started
+    path_x = np.full((num_steps + 1, len(seed_x)), np.nan)
+    path_y = np.full((num_steps + 1, len(seed_x)), np.nan)
+    seed_x, seed_y = np.asarray(seed_x, dtype=float), np.asarray(seed_y, dtype=float)
+    path_x[0], path_y[0] = seed_x, seed_y
+
+    active = np.arange(len(seed_x))     # particles that are still moving
+    closed = np.zeros(len(seed_x), dtype=bool)
+    x, y = seed_x, seed_y
+    h = np.broadcast_to(step, x.shape)
+
+    for i in range(1, num_steps + 1):
+        k1x, k1y = field_direction(func_x, func_y, x, y)
+        k2x, k2y = field_direction(func_x, func_y, x + h / 2 * k1x, y + h / 2 * k1y)
+        k3x, k3y = field_direction(func_x, func_y, x + h / 2 * k2x, y + h / 2 * k2y)
+        k4x, k4y = field_direction(func_x, func_y, x + h * k3x, y + h * k3y)
+        new_x = x + h / 6 * (k1x + 2 * k2x + 2 * k3x + k4x)
+        new_y = y + h / 6 * (k1y + 2 * k2y + 2 * k3y + k4y)
+
+        with np.errstate(all="ignore"):
+            # particles stop when the field is undefined, when they leave the screen or when they stagnate, which is
+            # when the directions inside the step cancel out e.g. at a sink
+            keep = (np.isfinite(new_x) & np.isfinite(new_y) &
+                    (x_range[0] <= new_x) & (new_x <= x_range[1]) & (y_range[0] <= new_y) & (new_y <= y_range[1]) &
+                    (np.hypot(new_x - x, new_y - y) > np.abs(h) / 2))
+            returned = (i >= 3) & (np.hypot(new_x - seed_x[active], new_y - seed_y[active]) <= np.abs(h))  # closed
+            # loops are stopped once they get back to where they started
+        closed[active[keep & returned]] = True
+        keep &= ~returned
+
+        active, x, y, h = active[keep], new_x[keep], new_y[keep], h[keep]
+        if len(active) == 0:
+            break
+        path_x[i, active], path_y[i, active] = x, y
+
+    return path_x, path_y, closed
+
+
+def streamlines(func_x, func_y, seed_x, seed_y, step, num_steps, x_range, y_range):
+    # follows the field forwards and backwards from every seed, returns a list of (x, y) arrays, one per streamline
+    n = len(seed_x)
+    path_x, path_y, closed = integrate_streamlines(func_x, func_y, np.concatenate([seed_x, seed_x]),
+                                                   np.concatenate([seed_y, seed_y]), np.repeat([step, -step], n),
+                                                   num_steps, x_range, y_range)    # both directions are integrated in
+    # the same pass
+    lengths = np.isfinite(path_x).sum(axis=0)   # number of points in each path
+
+    lines = []
+    for i in range(n):
+        backward, forward = lengths[n + i], lengths[i]
+        if closed[i]:   # the forwards path went all the way round a closed orbit, following it backwards would draw
+            # the orbit again so the loop is closed at the seed instead
+            x = np.append(path_x[:forward, i], path_x[0, i])
+            y = np.append(path_y[:forward, i], path_y[0, i])
+        else:
+            x = np.concatenate([path_x[backward - 1:0:-1, n + i], path_x[:forward, i]])     # joins the backwards path
+            y = np.concatenate([path_y[backward - 1:0:-1, n + i], path_y[:forward, i]])     # onto the forwards path
+        if len(x) > 1:
+            lines.append((x, y))
+    return lines
+
+
+if __name__ == "__main__":
+    seeds = np.linspace(-2, 2, 5)
+    circles = streamlines(lambda x, y: -y, lambda x, y: x, seeds, np.zeros(5), 0.05, 400, [-3, 3], [-3, 3])
+    print(len(circles), [len(x) for x, y in circles])
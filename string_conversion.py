@@ -1,195 +1,142 @@
-from list_validation import validate_list, vector_validate_list
-import numpy as np  # numpy needs to be imported here as the python functions are generated in this module
-
-
-def get_type_and_var_set(expression_list, expression_table):
-    variable_set = set()    # intialises variable set
-    expression_type = {"coords": "", "class": "function"}   # initialises expression's type
-
-    for i in expression_list:
-        if expression_table[i] == "variable":   # adds variables to variable set
-            variable_set.add(i)
-        elif i == "=":  # if there is an equals sign then the expression will be classed as a mapping
-            expression_type["class"] = "mapping"
-
-    if "x" in variable_set or "y" in variable_set or len(variable_set) == 0:    # x/y implies cartesian expression
-        expression_type["coords"] = "cartesian"
-
-        if expression_type["class"] == "mapping":
-            variable_set = ["x", "y"]   # mappings are assigned two variables regardless
-
-    elif "r" in variable_set or "θ" in variable_set:  # r/theta implies polar expression
-        expression_type["coords"] = "polar"
-
-        if expression_type["class"] == "mapping":
-            variable_set = ["θ", "r"]
-
-    return expression_type, variable_set
-
-
-def multiplication_convention_removal(expression_list, expression_table):
-    output = []  # output expression_list
-    prev = None  # last element in expression list
-
-    for i in expression_list:
-        if prev is not None:     # prevents using None as a key for the expression_table
-            if (expression_table[i] in ["variable", "constant", "function", "open_bracket"]) and \
-                    (expression_table[prev] in ["variable", "constant", "number", "closed_bracket"]):
-                output.append("*")
-            elif expression_table[i] == "number" and expression_table[prev] in ["constant", "variable", "closed_bracket"]:
-                output.append("*")  # checks if multiplication symbol is needed by looking at the previous element
-                # and adds * to the output list if needed
-        output.append(i)    # adds element to the output list
-        prev = i    # sets previous element
-
-    # expression table needs to be updated if multiplication signs have been added
-    if "*" in output:
-        expression_table.update({"*": "operator"})
-
-    return output, expression_table
-
-
-def function_convention_removal(expression_list, expression_table):
-    output = []  # output expression_list
-    prev = None  # last element in expression list
-    i = 0  # index in expression list for the while loop
-    open_bracks = 0
-
-    while i < len(expression_list):
-
-        if prev is not None:  # prevents accessing dictionary with None key
-            while expression_table[prev] == "function" and expression_list[i] != "(":
-                # looks for functions not followed by an open bracket
-
-                output.append("(")
-                open_bracks += 1  # adds the open bracket
-
-                output.append(expression_list[i])
-                prev = expression_list[i]  # adds the item to the list and updates pointers
-                i += 1
-
-        # in case we encounter a function we also need to make sure that we add brackets after its arguments
-            if expression_table[prev] == "function" and expression_list[i] == "(":
-                bracket_stack = ["("]
-
-                i += 1
-                start = i
-                while bracket_stack:
-                    if expression_list[i] == ")":
-                        bracket_stack.pop()
-                    elif expression_list[i] == "(":
-                        bracket_stack.append("(")
-                    i += 1
-                end = i
-                output += ["("] + function_convention_removal(expression_list[start:end-1], expression_table)[0] + [")"]
-
-            for j in range(open_bracks):  # adds in the closed brackets to account for the added open brackets
-                output.append(")")
-            open_bracks = 0  # sets number of open brackets to 0
-
-        if i < len(expression_list):
-            output.append(expression_list[i])  # adds item to the list and updates pointers
-            prev = expression_list[i]
-            i += 1
-
-    # expression table needs to be updated if brackets have been added
-    if "(" in output:
-        expression_table.update({"(": "open_bracket", ")": "closed_bracket"})
-
-
-    return output, expression_table
-
-
-def python_convention_addition(expression_list, expression_table, p_functions, p_constants):
-    output = []     # new expression_list
-    for i in expression_list:    # iterates through expression list
-        if i == "^":    # if the element is not in valid python syntax the Python equivalent is added instead
-            output.append("**")  # using a dictionary
-        elif expression_table[i] == "function":
-            output.append(p_functions[i])
-        elif expression_table[i] == "constant":
-            output.append(p_constants[i])
+from expression_parser import parse_expression, parse_vector_component, Number, Variable, Constant, Negate, \
+    BinaryOperation, FunctionCall
+import numpy as np  # numpy is needed to fold constants the same way they are evaluated
+import operator
+
+OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "^": operator.pow}
+
+
+def fold_constants(node, p_functions, p_constants):
+    # evaluates any part of the tree that doesn't depend on a variable e.g. 2π or csc(π/2) so it is only calculated
+    # once instead of every time the function is called
+    if isinstance(node, Constant):
+        return Number(p_constants[node.name])
+    if isinstance(node, Negate):
+        operand = fold_constants(node.operand, p_functions, p_constants)
+        if isinstance(operand, Number):
+            return Number(-operand.value)
+        return Negate(operand)
+    if isinstance(node, BinaryOperation):
+        left = fold_constants(node.left, p_functions, p_constants)
+        right = fold_constants(node.right, p_functions, p_constants)
+        if isinstance(left, Number) and isinstance(right, Number):
+            with np.errstate(all="ignore"):     # numpy floats give inf/nan instead of raising errors, like arrays
+                return Number(OPERATORS[node.operator](np.float64(left.value), right.value))
+        return BinaryOperation(node.operator, left, right)
+    if isinstance(node, FunctionCall):
+        argument = fold_constants(node.argument, p_functions, p_constants)
+        if isinstance(argument, Number):
+            with np.errstate(all="ignore"):
+                return Number(p_functions[node.name](np.float64(argument.value)))
+        return FunctionCall(node.name, argument)
+    return node     # numbers and variables
+
+
+def compile_tree(tree, variables, p_functions, p_constants):
+    # compiles the tree into a list of steps that is run by a closure, identical subtrees e.g. the two sin(x)s in
+    # sin(x)^2 + sin(x) are only given one step so they are only evaluated once
+    tree = fold_constants(tree, p_functions, p_constants)
+
+    slots = {Variable(variable): i for i, variable in enumerate(variables)}    # where each subtree's value is kept
+    values = []     # values of the slots that are known before the function is called
+    steps = []  # [(function, input slots, output slot)...] in the order they need to be run
+
+    def visit(node):
+        if node in slots:   # subtree has already been compiled
+            return slots[node]
+        slot = len(variables) + len(values)
+        if isinstance(node, Number):
+            values.append(node.value)
         else:
-            output.append(i)    # if the item is in valid python syntax it gets added to the new list
-
-    return output
-
-
-def function_generation(expression_list, variable_set):
-    expression_string = "".join(expression_list)    # turns the expression list back into a string to use eval
-    var_string = ",".join(list(variable_set))   # turns the variable set into a string with commas separating values
-
-    return eval(f"lambda {var_string}: {expression_string}")
-
-
-def mapping_generation(expression_list, variable_set):
-    for i in range(len(expression_list)):   # iterates through list to find the where the equals sign is
-
-        if expression_list[i] == "=":   # if an equals sign is encountered the string gets converted into the correct
-            # form: the condition and the implicit function.
-            expression_list_1 = ["("] + expression_list[i+1:] + [") - ("] + expression_list[:i] + [") < 0"]
-            expression_list_2 = ["("] + expression_list[i+1:] + [") - ("] + expression_list[:i] + [")"]
-
-            return [function_generation(expression_list_1, variable_set),   # returns both functions
-                    function_generation(expression_list_2, variable_set)]
-
-
-def expression_to_function(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators):
-    # converts string to list and validates the list
-    express = validate_list(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators)
+            if isinstance(node, Negate):
+                function, inputs = operator.neg, (visit(node.operand),)
+            elif isinstance(node, BinaryOperation):
+                function, inputs = OPERATORS[node.operator], (visit(node.left), visit(node.right))
+            elif isinstance(node, FunctionCall):
+                function, inputs = p_functions[node.name], (visit(node.argument),)
+            else:
+                raise TypeError(f"unknown node {node}")
+            slot = len(variables) + len(values)     # inputs may have added values
+            values.append(None)     # calculated when the function is called
+            steps.append((function, inputs, slot))
+        slots[node] = slot
+        return slot
+
+    result = visit(tree)
+
+    def evaluate(*args):
+        registers = list(args) + values
+        for function, inputs, output in steps:
+            registers[output] = function(*[registers[i] for i in inputs])
+        return registers[result]
+
+    return evaluate
+
+
+def expression_to_function(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators,
+                           previous_function=None, history=None):
+    # parses and validates the string in one pass, giving the expression tree, its type and its variables, only the
+    # part of the string that changed since the text in history is parsed again
+    express = parse_expression(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators,
+                               history)
     if express is False:
         return False
-    express_type, express_vars = get_type_and_var_set(express["list"], express["table"])
-
-    express["list"], express["table"] = multiplication_convention_removal(express["list"], express["table"])
-    express["list"], express["table"] = function_convention_removal(express["list"], express["table"])
-    express["list"] = python_convention_addition(express["list"], express["table"], p_functions, p_constants)
-    # gets rid of any mathematical conventions that do not agree with python syntax and converts the elements in the
-    # list to python syntax
 
-    if express_type["class"] == "mapping":  # depending on the type of expression the python function generated will
-        func = mapping_generation(express["list"], express_vars)    # be different
-        # [condition, implicit function]
+    if getattr(previous_function, "tree", None) == express["tree"]:    # the edit didn't change the structure of the
+        func = previous_function    # expression e.g. brackets were added around it, so it isn't compiled again
+    elif express["type"]["class"] == "mapping":  # depending on the type of expression the python function generated
+        func = mapping_generation(express["tree"], express["variables"], p_functions, p_constants)  # will be different
     else:
-        func = function_generation(express["list"], express_vars)   # explicit function
+        func = function_generation(express["tree"], express["variables"], p_functions, p_constants)  # explicit function
+    func.tree = express["tree"]     # kept so the next edit can be compared against it
 
-    return {"function": func, "type": express_type, "variables": express_vars}
+    return {"function": func, "type": express["type"], "variables": express["variables"]}
 
 
-def vector_expression_to_function(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators):
+def vector_expression_to_function(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators,
+                                  previous_function=None, history=None):
     # the expression string here is a component of a vector
-    # converts string into a validated list and also creates a lookup table for elements
-    express = vector_validate_list(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators)
+    tree = parse_vector_component(expression_string, p_functions, p_variables, p_constants, p_numbers, p_operators,
+                                  history)
 
-    if express is False:    # checks for invalid expressions
+    if tree is False:    # checks for invalid expressions
         return False
 
-    express_vars = ["x", "y"]   # these are the only variables that will be passed for all vectors
+    if getattr(previous_function, "tree", None) == tree:   # structure is unchanged so the previous function is reused
+        return previous_function
 
-    express["list"], express["table"] = multiplication_convention_removal(express["list"], express["table"])
-    express["list"], express["table"] = function_convention_removal(express["list"], express["table"])
-    express["list"] = python_convention_addition(express["list"], express["table"], p_functions, p_constants)
-    # gets rid of any mathematical conventions that do not agree with python syntax and converts the elements in the
-    # list to python syntax
+    express_vars = ["x", "y"]   # these are the only variables that will be passed for all vectors
 
-    func = function_generation(express["list"], express_vars)   # generates the function for the given vector component
+    func = function_generation(tree, express_vars, p_functions, p_constants)  # generates the function for the given
+    # vector component
+    func.tree = tree
 
     return func  # returns the Python function used to generate a vector Field object
 
 
+def function_generation(tree, variable_set, p_functions, p_constants):
+    return compile_tree(tree, list(variable_set), p_functions, p_constants)   # variables are passed in this order
+
+
+def mapping_generation(tree, variable_set, p_functions, p_constants):
+    # the mapping gets converted into an implicit function, (rhs) - (lhs) < 0 is the condition for a point to be inside
+    # the contour so one function gives both
+    return function_generation(BinaryOperation("-", tree.right, tree.left), variable_set, p_functions, p_constants)
+
+
 if __name__ == "__main__":
     functions = {
-        "ln": "np.log",
-        "sin": "np.sin", "cos": "np.cos", "tan": "np.tan",
-        "csc": "1/np.sin", "sec": "1/np.cos", "cot": "1/np.tan",
-        "sinh": "np.sinh", "cosh": "np.cosh", "tanh": "np.tanh",
-        "arcsin": "np.arcsin", "arccos": "np.arccos", "arctan": "np.arctan",
-        "arcsinh": "np.arcsinh", "arccosh": "np.arccosh", "arctanh": "np.arctanh"
+        "ln": np.log,
+        "sin": np.sin, "cos": np.cos, "tan": np.tan,
+        "csc": lambda a: 1 / np.sin(a), "sec": lambda a: 1 / np.cos(a), "cot": lambda a: 1 / np.tan(a),
+        "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh,
+        "arcsin": np.arcsin, "arccos": np.arccos, "arctan": np.arctan,
+        "arcsinh": np.arcsinh, "arccosh": np.arccosh, "arctanh": np.arctanh
     }
     variables = ["r", "θ", "x", "y"]
-    constants = {"e": "np.e", "pi": "np.pi"}
+    constants = {"e": np.e, "pi": np.pi}
     numbers = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
     operators = ["+", "-", "=", "*", "/", "^"]
     pstring = "sintancos(x)"
 
-    print(expression_to_function(pstring, functions, variables, constants, numbers, operators))
+    print(expression_to_function(pstring, functions, variables, constants, numbers, operators)["function"](1.0))
@@ -0,0 +1,51 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules are in the repo root
+
+from contour_algorithms import grid_segments, quadtree_segments, stitch_segments
+
+
+def circle(x, y):
+    return 4 - (x ** 2 + y ** 2)
+
+
+def quadtree_lines(evaluate, coarse, max_depth=4, max_cells=100000):
+    # plots [-3, 3] x [-3, 3] the same way Mapping does, ends up to 2 of the smallest cells apart are joined
+    segments = quadtree_segments(evaluate, [-3, 3], [-3, 3], coarse, coarse, max_depth, max_cells)
+    return stitch_segments(segments, 2 * 6 / coarse / 2 ** max_depth)
+
+
+def test_smooth_curve_is_one_line():
+    lines = quadtree_lines(circle, 16)
+    assert len(lines) == 1
+    assert (lines[0][0] == lines[0][-1]).all()    # the circle is closed
+    assert np.abs(np.hypot(lines[0][:, 0], lines[0][:, 1]) - 2).max() < 0.01
+
+
+def test_smooth_curve_point_budget():
+    # the quadtree's smallest cells are as small as the grid's cells, but straight parts of the curve shouldn't need
+    # as many points as the grid gives them
+    grid = stitch_segments(grid_segments(circle, np.linspace(-3, 3, 257), np.linspace(-3, 3, 257)))
+    lines = quadtree_lines(circle, 16)
+    assert len(lines[0]) <= len(grid[0]) / 2
+
+
+def test_crossing_curves_join_up():
+    # sin(x) = cos(y) is made of straight lines that cross at saddle points, every T-junction where cells of different
+    # sizes meet should be joined so there are no more lines than the fixed grid gives
+    def evaluate(x, y):
+        return np.cos(y) - np.sin(x)
+    grid = stitch_segments(grid_segments(evaluate, np.linspace(-3, 3, 257), np.linspace(-3, 3, 257)))
+    assert len(quadtree_lines(evaluate, 16)) <= len(grid)
+
+
+def test_asymptotes_are_not_joined():
+    # tan(x) = y has a sign change at each asymptote, which shouldn't be drawn as part of the contour
+    def evaluate(x, y):
+        return y - np.tan(x)
+    lines = quadtree_lines(evaluate, 16)
+    assert len(lines) == 3  # one branch between each pair of asymptotes at -pi/2 and pi/2
+    for line in lines:
+        assert np.ptp(np.floor((line[:, 0] + np.pi / 2) / np.pi)) == 0  # each line stays between two asymptotes
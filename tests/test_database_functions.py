@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules are in the repo root
+
+import database_functions
+
+GRAPHS = [
+    ("Sine waves", ["sin(x)", "sin(2x)"]),
+    ("SINH", ["sinh(x)"]),
+    ("circle_2", ["x^2+y^2=4"]),
+    ("Café", ["r=cos(3θ)"]),
+    ("ÉCOLE", ["y=x"]),
+    ("\u212a scale", ["e^x"]),  # the Kelvin sign, which Python makes into a lower case k
+    ("naïve", ["tan(x)"]),
+]
+
+SEARCHES = ["sin", "SIN", "sinh", "sin(", "2", "circle_", "_", "caf", "cafe", "café", "CAFÉ", "ecole", "école", "k",
+            "kelvin", "naive", "θ", "x y", "%"]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    database_functions.close_connection()
+    monkeypatch.setattr(database_functions, "DATABASE", str(tmp_path / "graphs.db"))
+    for number, (name, expressions) in enumerate(GRAPHS):
+        graph_id = f"graph{number}"
+        database_functions.save_as(graph_id, name, "2d", "2024-01-01", "2024-01-01",
+                                   [(f"e{i}", graph_id, text) for i, text in enumerate(expressions)])
+    yield
+    database_functions.close_connection()
+
+
+def compare(search_item):
+    # graph_matches should find exactly the graphs find_graphs does out of the graphs it can be used to narrow down
+    numbers = [row[0] for row in database_functions.find_graphs("", "name", "all", numbers=True)]
+    texts = database_functions.graph_texts(numbers)
+    checked = {number: text for number, text in zip(numbers, texts)
+               if database_functions.can_narrow(search_item, [text])}
+    found = {row[0] for row in database_functions.find_graphs(search_item, "name", "all", numbers=True)}
+    matched = {number for number, (name, expressions) in checked.items()
+               if database_functions.graph_matches(search_item, name, expressions)}
+    assert matched == found & set(checked), search_item
+    return len(checked)
+
+
+@pytest.mark.parametrize("search_item", SEARCHES)
+def test_graph_matches_like(database, monkeypatch, search_item):
+    monkeypatch.setattr(database_functions, "full_text_search", False)
+    assert compare(search_item) == len(GRAPHS)  # LIKE can always be copied exactly
+
+
+@pytest.mark.parametrize("search_item", [search_item for search_item in SEARCHES if search_item.isascii()])
+def test_graph_matches_index(database, search_item):
+    assert database_functions.full_text_search
+    assert compare(search_item) > 0
+
+
+def test_index_ascii_only(database):
+    # the saved text has letters with accents so searches with the index can't be narrowed down
+    texts = database_functions.graph_texts([row[0] for row in
+                                            database_functions.find_graphs("", "name", "all", numbers=True)])
+    assert not database_functions.can_narrow("sin", texts)
+    assert database_functions.can_narrow("sin", [("Sine waves", "sin(x)")])
+    assert not database_functions.can_narrow("café", [("Sine waves", "sin(x)")])
+
+
+def test_graph_numbers_survive_migration_and_vacuum(tmp_path, monkeypatch):
+    # a version 3 database where a deleted graph left a gap in the rowids, which VACUUM would close up
+    path = str(tmp_path / "old.db")
+    old = sqlite3.connect(path)
+    for migration in database_functions.MIGRATIONS[:3]:
+        for statement in migration:
+            old.execute(statement)
+    for graph_id, name, expression in [("a", "Sine", "sin(x)"), ("b", "Gone", "x"), ("c", "Cosine", "cos(x)")]:
+        old.execute("INSERT INTO Graphs VALUES (?, ?, '2d', '2024-01-01', '2024-01-01')", (graph_id, name))
+        old.execute("INSERT INTO Expressions VALUES (?, ?, ?)", (f"e{graph_id}", graph_id, expression))
+    old.execute("DELETE FROM Expressions WHERE graph_id = 'b'")
+    old.execute("DELETE FROM Graphs WHERE graph_id = 'b'")
+    old.execute("PRAGMA user_version = 3")
+    old.commit()
+    old.close()
+
+    database_functions.close_connection()
+    monkeypatch.setattr(database_functions, "DATABASE", path)
+    try:
+        def numbers(search_item):
+            found = [row[0] for row in database_functions.find_graphs(search_item, "name", "all", numbers=True)]
+            return {number: row[1] for number, row in zip(found, database_functions.find_by_number(found))}
+        assert numbers("") == {1: "Sine", 3: "Cosine"}     # the graphs keep their rowids as their numbers
+        assert database_functions.get_expressions("c")[0][1] == "cos(x)"
+        database_functions.get_connection().execute("VACUUM")
+        assert numbers("") == {1: "Sine", 3: "Cosine"}
+        assert numbers("cos") == {3: "Cosine"}
+        assert database_functions.get_connection().execute("PRAGMA user_version").fetchone()[0] == \
+            len(database_functions.MIGRATIONS)
+    finally:
+        database_functions.close_connection()
@@ -0,0 +1,71 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules are in the repo root
+
+from expression_parser import parse_expression, parse_vector_component, ParseHistory
+from list_conversion_algorithms import tokenise, retokenise
+
+FUNCTIONS = {name: None for name in ["ln", "sin", "cos", "tan", "sinh", "cosh", "tanh", "arcsin", "arcsinh"]}
+CONSTANTS = {"e": None, "π": None}
+NUMBERS = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+GRAMMAR = (FUNCTIONS, ["r", "θ", "x", "y"], CONSTANTS, NUMBERS, ["+", "-", "=", "*", "/", "^"])
+EXPRESSION = "sin(2x)^2 + (cos(x/3) - 1.5)*e^(x/10) = y"
+
+
+def edits(text, seed, count=300):
+    # random insertions and deletions, edits that leave the text invalid are undone by the next one like when typing
+    rng = random.Random(seed)
+    valid = text
+    for _ in range(count):
+        position = rng.randint(0, len(valid))
+        if rng.random() < 0.5:
+            text = valid[:position] + rng.choice(["x", "2", "(", ")", "+", " ", "h", "s", ".", "$", "="]) + \
+                valid[position:]
+        else:
+            text = valid[:position] + valid[position + 1:]
+        yield text
+        if parse_expression(text, *GRAMMAR) is not False:
+            valid = text
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_retokenise_matches_tokenise(seed):
+    old = EXPRESSION
+    old_tokens = tokenise(old, FUNCTIONS, CONSTANTS)
+    for new in edits(EXPRESSION, seed):
+        tokens, first, last, resume = retokenise(old, old_tokens, new, FUNCTIONS, CONSTANTS)
+        assert tokens == tokenise(new, FUNCTIONS, CONSTANTS)
+        assert tokens[:first] == old_tokens[:first] and len(tokens) - last == len(old_tokens) - resume
+        old, old_tokens = new, tokens
+
+
+def test_retokenise_only_changes_the_edit():
+    old = " + ".join([EXPRESSION[:-4]] * 10)
+    middle = len(old) // 2
+    new = old[:middle] + "h" + old[middle:]
+    old_tokens = tokenise(old, FUNCTIONS, CONSTANTS)
+    tokens, first, last, resume = retokenise(old, old_tokens, new, FUNCTIONS, CONSTANTS)
+    assert last - first <= 2 * max(map(len, FUNCTIONS))     # only the tokens near the edit were found again
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_parse_matches_full_parse(seed):
+    history = ParseHistory()
+    vector_history = ParseHistory()
+    vector_grammar = (FUNCTIONS, ["x", "y"], CONSTANTS, NUMBERS, ["+", "-", "*", "/", "^"])
+    for text in edits(EXPRESSION, seed):
+        assert parse_expression(text, *GRAMMAR, history) == parse_expression(text, *GRAMMAR)
+        assert parse_vector_component(text, *vector_grammar, vector_history) == \
+            parse_vector_component(text, *vector_grammar)
+
+
+def test_unchanged_brackets_are_reused():
+    history = ParseHistory()
+    before = parse_expression("sin(x+1)*cos(y) = x", *GRAMMAR, history)["tree"]
+    after = parse_expression("sin(x+1)*cos(y) = x^2", *GRAMMAR, history)["tree"]
+    assert after.left.left.argument is before.left.left.argument    # the brackets are taken from the last parse
+    assert parse_expression("sin(x+1)*cos(y) = x$", *GRAMMAR, history) is False
+    assert parse_expression("sin(x+1)*cos(y) = x$", *GRAMMAR) is False
@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules are in the repo root
+
+from sampling_algorithms import adaptive_sample, find_breaks, split_curve
+
+
+def curves(function, start, end, resolution, limit):
+    # samples and splits a curve the same way Expression.get_curves does
+    x, y = adaptive_sample(function, start, end, 32, 0.5 / resolution, lambda a, b: (a, b), limit)
+    return split_curve(x, y, find_breaks(x, y, x, y, 1 / resolution, limit))
+
+
+def crosses(curve, point):
+    return curve[0].min() < point < curve[0].max()
+
+
+def test_step_function_zoomed_out():
+    # the jump is much smaller than the screen when zoomed out but it still shouldn't be joined up
+    lines = curves(lambda x: x / np.abs(x), -80, 80, 12, 45)
+    assert len(lines) == 2
+    assert not any(crosses(line, 0) for line in lines)
+
+
+def test_even_pole():
+    # both sides of x^-2 go off the top of the screen, the curve is only split at the pole
+    lines = curves(lambda x: x ** -2.0, -5, 5, 192, 2.8)
+    assert len(lines) == 2
+    assert not any(crosses(line, 0) for line in lines)
+
+
+def test_odd_poles():
+    lines = curves(np.tan, -5, 5, 192, 2.8)
+    for pole in (-3 * np.pi / 2, -np.pi / 2, np.pi / 2, 3 * np.pi / 2):
+        assert not any(crosses(line, pole) for line in lines)
+
+
+def test_oscillating_function():
+    # sin(1/x) oscillates too fast to be sampled near 0 but it is continuous, so the samples shouldn't be split up
+    lines = curves(lambda x: np.sin(1 / x), -5, 5, 192, 2.8)
+    assert len(lines) <= 2
+    lines = curves(lambda x: np.sin(50 * x), -80, 80, 12, 45)
+    assert len(lines) == 1
@@ -0,0 +1,31 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules are in the repo root
+
+from streamline_algorithms import streamlines
+
+
+def arc_length(x, y):
+    return np.hypot(np.diff(x), np.diff(y)).sum()
+
+
+def test_closed_orbits_are_drawn_once():
+    # every streamline of a rotational field is a circle around the origin
+    seeds = np.array([-2, -1, 1, 2], dtype=float)
+    lines = streamlines(lambda x, y: -y, lambda x, y: x, seeds, np.zeros(4), 0.05, 400, [-3, 3], [-3, 3])
+    assert len(lines) == 4
+    for (x, y), radius in zip(lines, np.abs(seeds)):
+        assert x[0] == x[-1] and y[0] == y[-1]    # the loop is closed
+        assert np.abs(np.hypot(x, y) - radius).max() < 0.01
+        assert arc_length(x, y) < 1.05 * 2 * np.pi * radius
+
+
+def test_open_streamlines_go_both_ways():
+    # a uniform field's streamlines cross the whole screen from a seed in the middle
+    lines = streamlines(lambda x, y: 1 + 0 * x, lambda x, y: 0 * y, np.zeros(1), np.zeros(1), 0.05, 400,
+                        [-3, 3], [-3, 3])
+    assert len(lines) == 1
+    x, y = lines[0]
+    assert x[0] < -2.9 and x[-1] > 2.9
@@ -0,0 +1,84 @@
+from collections import namedtuple
+import numpy as np  # numpy is needed so whole arrays of points are converted at once
+
+
+class Viewport(namedtuple("Viewport", ["resolution", "displacement_x", "displacement_y", "width", "height"])):
+    # the part of the plane shown on the graphing window, converts between plane coordinates and window coordinates
+    # (pixels with y going down the screen), resolution is the number of pixels per grid unit and the displacement is
+    # the plane point at the top left of the window
+    # viewports can't be changed so a plot calculated on another thread always uses the viewport it was started with,
+    # moving or zooming gives a new viewport, every conversion works on single numbers and on numpy arrays
+    __slots__ = ()
+
+    @classmethod
+    def from_point(cls, resolution, window_point, plane_point, width, height):
+        # the viewport where window_point shows plane_point
+        return cls(resolution, plane_point[0] - window_point[0] / resolution,
+                   plane_point[1] + window_point[1] / resolution, width, height)
+
+    def to_window_x(self, plane_x):
+        return self.resolution * (plane_x - self.displacement_x)
+
+    def to_window_y(self, plane_y):
+        return self.resolution * (self.displacement_y - plane_y)
+
+    def to_plane_x(self, window_x):
+        return self.displacement_x + window_x / self.resolution
+
+    def to_plane_y(self, window_y):
+        return self.displacement_y - window_y / self.resolution
+
+    def window_coords(self, x, y):
+        # converts arrays of plane x and y coords into one flat list [x1, y1, x2, y2...] that create_line takes
+        return ((np.column_stack([x, y]) - (self.displacement_x, self.displacement_y)) *
+                (self.resolution, -self.resolution)).ravel().tolist()
+
+    def window_lines(self, curves):
+        # converts a list of (x, y) arrays, one for each line of a plot, all at once and splits the flat coords back
+        # up into a list for each line
+        if not curves:
+            return []
+        coords = self.window_coords(np.concatenate([x for x, y in curves]), np.concatenate([y for x, y in curves]))
+        lines = []
+        start = 0
+        for x, y in curves:
+            lines.append(coords[start:start + 2 * len(x)])
+            start += 2 * len(x)
+        return lines
+
+    def window_segments(self, x1, y1, x2, y2):
+        # converts arrays of segment start and end points into a list of [x1, y1, x2, y2] for each segment
+        return ((np.column_stack([x1, y1, x2, y2]) - (self.displacement_x, self.displacement_y) * 2) *
+                ((self.resolution, -self.resolution) * 2)).tolist()
+
+    @property
+    def cartesian_range(self):
+        return {"x": [self.displacement_x, self.to_plane_x(self.width)],    # range of x vals
+                "y": [self.to_plane_y(self.height), self.displacement_y]}   # range of y vals
+
+    @property
+    def polar_range(self):
+        # here "x" references theta and "y" references r
+        r_max = np.hypot(self.width, self.height) / self.resolution / 2     # gets length of screen diagonal and
+        return {"x": [0, 2 * np.pi], "y": [-r_max, r_max]}                  # divides it by 2
+
+    def cache_key(self):
+        # identifies the viewport and how finely it is sampled, the range is rounded since zooming in and back out
+        # doesn't give exactly the same floats
+        cartesian_range = self.cartesian_range
+        return tuple(round(value, 6) for value in cartesian_range["x"] + cartesian_range["y"]) + (self.resolution,)
+
+    def moved(self, dx, dy):
+        # the viewport after the plane has been dragged dx, dy pixels, window coordinates have a flipped orientation
+        # so dy is added
+        return self._replace(displacement_x=self.displacement_x - dx / self.resolution,
+                             displacement_y=self.displacement_y + dy / self.resolution)
+
+    def zoomed(self, resolution):
+        # the viewport with a different resolution, the centre of the window doesn't change
+        centre = [self.width / 2, self.height / 2]
+        return self.from_point(resolution, centre, [self.to_plane_x(centre[0]), self.to_plane_y(centre[1])],
+                               self.width, self.height)
+
+    def resized(self, width, height):
+        return self._replace(width=width, height=height)    # the top left corner stays in the same place